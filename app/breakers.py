@@ -0,0 +1,185 @@
+"""Circuit breakers of source database servers."""
+
+from enum import Enum
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from app import config
+
+UNREACHABLE_MESSAGES = (
+    "can't connect",
+    "could not connect",
+    "could not translate host name",
+    "connection refused",
+    "connection timed out",
+    "timeout expired",
+    "name or service not known",
+    "no route to host",
+    "connect call failed",
+    "temporary failure in name resolution",
+)
+
+
+class State(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of connecting to a server whose circuit breaker is open."""
+
+    def __init__(self, host: str) -> None:
+        super().__init__(f"Database server {host} is unavailable, try again later.")
+
+
+def is_unreachable(error: Exception) -> bool:
+    """Tells if a connection error means the database server can't be reached."""
+    error = getattr(error, "orig", None) or error
+    message = str(error).lower()
+    return isinstance(error, OSError) or any(
+        unreachable in message for unreachable in UNREACHABLE_MESSAGES
+    )
+
+
+def host_key(source_connection: dict[str, Any]) -> tuple:
+    """Returns the key of a source connection's database server."""
+    return (
+        source_connection["type"],
+        source_connection["host"],
+        source_connection["port"],
+    )
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated connection failures to a database server.
+    Once the reset timeout has passed, a single connection attempt is let
+    through to probe recovery, closing the breaker if it succeeds.
+    """
+
+    def __init__(self, host: str, failure_threshold: int, reset_timeout: int) -> None:
+        self.__host = host
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+        self.__state = State.CLOSED
+        self.__failures = 0
+        self.__opened_at = 0.0
+        self.__probing = False
+        self.__lock = Lock()
+
+    def __current_state(self) -> State:
+        if (
+            self.__state == State.OPEN
+            and monotonic() - self.__opened_at >= self.__reset_timeout
+        ):
+            self.__state = State.HALF_OPEN
+            self.__probing = False
+
+        return self.__state
+
+    def before_connect(self) -> None:
+        """Raises CircuitOpenError if connecting is not allowed."""
+        with self.__lock:
+            state = self.__current_state()
+
+            if state == State.OPEN or (state == State.HALF_OPEN and self.__probing):
+                raise CircuitOpenError(self.__host)
+
+            if state == State.HALF_OPEN:
+                self.__probing = True
+
+    def record_success(self) -> None:
+        with self.__lock:
+            self.__state = State.CLOSED
+            self.__failures = 0
+            self.__probing = False
+
+    def record_failure(self) -> None:
+        with self.__lock:
+            self.__failures += 1
+            self.__probing = False
+
+            if (
+                self.__state == State.HALF_OPEN
+                or self.__failures >= self.__failure_threshold
+            ):
+                self.__state = State.OPEN
+                self.__opened_at = monotonic()
+
+    def status(self) -> dict[str, Any]:
+        with self.__lock:
+            state = self.__current_state()
+            retry_in = (
+                max(self.__reset_timeout - (monotonic() - self.__opened_at), 0)
+                if state == State.OPEN
+                else 0
+            )
+
+            return {
+                "host": self.__host,
+                "state": state,
+                "failures": self.__failures,
+                "retry_in": round(retry_in, 2),
+            }
+
+
+class CircuitBreakerRegistry:
+    """Keeps one circuit breaker per database server."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: int) -> None:
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+        self.__breakers: dict[tuple, CircuitBreaker] = {}
+        self.__lock = Lock()
+
+    def get(self, source_connection: dict[str, Any]) -> CircuitBreaker:
+        """Returns the circuit breaker of a source connection's server."""
+        key = host_key(source_connection)
+
+        with self.__lock:
+            if key not in self.__breakers:
+                type, host, port = key
+                self.__breakers[key] = CircuitBreaker(
+                    f"{type}://{host}:{port}",
+                    self.__failure_threshold,
+                    self.__reset_timeout,
+                )
+
+            return self.__breakers[key]
+
+    def guard(self, engine: Engine, source_connection: dict[str, Any]) -> None:
+        """Passes every new connection of an engine through its server's breaker."""
+        breaker = self.get(source_connection)
+
+        @event.listens_for(engine, "do_connect")
+        def receive_do_connect(dialect, connection_record, cargs, cparams):
+            breaker.before_connect()
+
+            try:
+                connection = dialect.connect(*cargs, **cparams)
+            except Exception as error:
+                if is_unreachable(error):
+                    breaker.record_failure()
+                else:
+                    # the server answered, e.g. with an authentication error
+                    breaker.record_success()
+                raise
+
+            breaker.record_success()
+            return connection
+
+    def status(self) -> list[dict[str, Any]]:
+        with self.__lock:
+            breakers = list(self.__breakers.values())
+
+        return [breaker.status() for breaker in breakers]
+
+
+circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=config.BREAKER_RESET_TIMEOUT,
+)
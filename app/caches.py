@@ -0,0 +1,118 @@
+"""In-process caches shared across requests."""
+
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Hashable
+
+from app import config
+from app.databases.engines import connection_key
+from app.metrics import CACHE_REQUESTS
+
+
+class TTLCache:
+    """
+    Size-bounded cache whose entries expire after a time to live.
+    Least recently used entries are evicted when the cache is full.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float) -> None:
+        self.__name = name
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__entries: OrderedDict[Hashable, tuple[Any, float, float]] = OrderedDict()
+        self.__lock = Lock()
+
+    def get(self, key: Hashable) -> tuple[Any, float] | None:
+        """Returns the cached value and its age in seconds, or None."""
+        now = monotonic()
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is None:
+                CACHE_REQUESTS.labels(self.__name, "miss").inc()
+                return None
+
+            value, created_at, ttl = entry
+
+            if now - created_at > ttl:
+                del self.__entries[key]
+                CACHE_REQUESTS.labels(self.__name, "miss").inc()
+                return None
+
+            self.__entries.move_to_end(key)
+
+        CACHE_REQUESTS.labels(self.__name, "hit").inc()
+        return value, now - created_at
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Caches a value, optionally with its own time to live.
+        A time to live of 0 keeps no entry.
+        """
+        ttl = self.__ttl if ttl is None else ttl
+
+        with self.__lock:
+            if ttl <= 0:
+                self.__entries.pop(key, None)
+                return
+
+            self.__entries[key] = (value, monotonic(), ttl)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> None:
+        """Removes every entry whose key matches."""
+        with self.__lock:
+            for key in [key for key in self.__entries if match(key)]:
+                del self.__entries[key]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+
+def metadata_key(source_connection: dict[str, Any], kind: str) -> tuple:
+    """Returns the metadata cache key of a source connection's schema and table."""
+    return (
+        *connection_key(source_connection),
+        source_connection.get("schema_name"),
+        source_connection.get("table_name"),
+        kind,
+    )
+
+
+def invalidate_metadata(id: int) -> None:
+    """Removes every cached metadata entry of a saved source connection."""
+    metadata_cache.invalidate(lambda key: key[0] == id)
+
+
+def test_result_key(source_connection: dict[str, Any]) -> str:
+    """
+    Returns the test result cache key of source connection parameters.
+    The parameters are hashed, so the password is never kept in clear.
+    """
+    parameters = {key: value for key, value in source_connection.items() if key != "id"}
+    return hashlib.sha256(
+        json.dumps(parameters, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+metadata_cache = TTLCache(
+    "metadata", max_size=config.METADATA_CACHE_SIZE, ttl=config.METADATA_CACHE_TTL
+)
+test_result_cache = TTLCache(
+    "test_result",
+    max_size=config.TEST_RESULT_CACHE_SIZE,
+    ttl=config.TEST_RESULT_SUCCESS_TTL,
+)
+unreachable_host_cache = TTLCache(
+    "unreachable_host",
+    max_size=config.TEST_RESULT_CACHE_SIZE,
+    ttl=config.UNREACHABLE_HOST_TTL,
+)
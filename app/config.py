@@ -0,0 +1,59 @@
+"""Application settings. Values are read from environment variables."""
+
+from os import getenv
+
+
+def _bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes")
+
+
+# source database connection pooling
+SOURCE_POOL_SIZE = int(getenv("SOURCE_POOL_SIZE", "5"))
+SOURCE_MAX_OVERFLOW = int(getenv("SOURCE_MAX_OVERFLOW", "10"))
+SOURCE_POOL_PRE_PING = _bool(getenv("SOURCE_POOL_PRE_PING", "true"))
+SOURCE_POOL_RECYCLE = int(getenv("SOURCE_POOL_RECYCLE", "1800"))  # seconds
+
+# source database engine registry
+ENGINE_REGISTRY_SIZE = int(getenv("ENGINE_REGISTRY_SIZE", "32"))
+ENGINE_IDLE_TIMEOUT = int(getenv("ENGINE_IDLE_TIMEOUT", "600"))  # seconds
+
+# reflected table names and schemas
+METADATA_CACHE_SIZE = int(getenv("METADATA_CACHE_SIZE", "1024"))
+METADATA_CACHE_TTL = int(getenv("METADATA_CACHE_TTL", "300"))  # seconds
+
+# batch testing of saved source connections
+TEST_BATCH_WORKERS = int(getenv("TEST_BATCH_WORKERS", "16"))
+TEST_BATCH_TIMEOUT = int(getenv("TEST_BATCH_TIMEOUT", "30"))  # seconds
+
+# source connection test results
+TEST_RESULT_CACHE_SIZE = int(getenv("TEST_RESULT_CACHE_SIZE", "1024"))
+TEST_RESULT_SUCCESS_TTL = int(getenv("TEST_RESULT_SUCCESS_TTL", "60"))  # seconds
+TEST_RESULT_FAILURE_TTL = int(getenv("TEST_RESULT_FAILURE_TTL", "15"))  # seconds
+UNREACHABLE_HOST_TTL = int(getenv("UNREACHABLE_HOST_TTL", "30"))  # seconds
+
+# source database timeouts, 0 disables them
+SOURCE_CONNECT_TIMEOUT = int(getenv("SOURCE_CONNECT_TIMEOUT", "10"))  # seconds
+SOURCE_STATEMENT_TIMEOUT = int(getenv("SOURCE_STATEMENT_TIMEOUT", "300"))  # seconds
+
+# circuit breakers of source database servers
+BREAKER_FAILURE_THRESHOLD = int(getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = int(getenv("BREAKER_RESET_TIMEOUT", "30"))  # seconds
+
+# parallel chunked extraction of table rows
+EXTRACT_PARALLELISM = int(getenv("EXTRACT_PARALLELISM", "4"))
+EXTRACT_CHUNK_SIZE = int(getenv("EXTRACT_CHUNK_SIZE", "50000"))  # rows
+
+# background jobs
+JOB_WORKERS = int(getenv("JOB_WORKERS", "2"))  # worker threads of the app process
+JOB_POLL_INTERVAL = float(getenv("JOB_POLL_INTERVAL", "1"))  # seconds
+JOB_PROGRESS_INTERVAL = float(getenv("JOB_PROGRESS_INTERVAL", "1"))  # seconds
+JOB_RESULTS_DIR = getenv("JOB_RESULTS_DIR", "job-results")
+JOB_LEASE_TIMEOUT = float(getenv("JOB_LEASE_TIMEOUT", "60"))  # seconds
+JOB_SHUTDOWN_TIMEOUT = float(getenv("JOB_SHUTDOWN_TIMEOUT", "30"))  # seconds
+
+# app database, any SQLAlchemy URL of SQLite, PostgreSQL or MySQL
+DATABASE_URL = getenv("DATABASE_URL", "sqlite:///app.db")
+DATABASE_POOL_SIZE = int(getenv("DATABASE_POOL_SIZE", "5"))
+SQLITE_BUSY_TIMEOUT = int(getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+SQLITE_CACHE_SIZE = int(getenv("SQLITE_CACHE_SIZE", "65536"))  # KiB
+SQLITE_MMAP_SIZE = int(getenv("SQLITE_MMAP_SIZE", "268435456"))  # bytes
@@ -1,7 +1,9 @@
-from typing import Any, Protocol, Sequence
+from typing import Any, Iterator, Protocol, Sequence
 
-from app.databases.mysql import MySQLdb
-from app.databases.postgres import PostgreSQLdb
+from app.databases.mysql import AsyncMySQLdb, MySQLdb
+from app.databases.postgres import AsyncPostgreSQLdb, PostgreSQLdb
+from app.metrics import STAGE_DURATION, timed
+from app.serializers import RowFormat
 
 
 class Database(Protocol):
@@ -9,7 +11,85 @@ class Database(Protocol):
 
     def get_table_schema(self) -> list[dict[str, Any]]: ...
 
-    def get_table_rows(self, limit: int = 10) -> Sequence[Any]: ...
+    def get_schema_fingerprint(self) -> str | None: ...
+
+    def get_catalog(self) -> list[dict[str, Any]]: ...
+
+    def get_table_columns(self) -> list[dict[str, Any]]: ...
+
+    def get_table_stats(self, exact: bool = False) -> dict[str, Any]: ...
+
+    def get_table_chunks(self, chunk_size: int = 10000) -> list[Any]: ...
+
+    def get_chunk_rows(self, chunk: Any) -> Sequence[Any]: ...
+
+    def get_table_rows(
+        self,
+        limit: int = 10,
+        format: RowFormat = "objects",
+        watermark: str | None = None,
+        since: str | None = None,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+        order: Sequence[str] | None = None,
+        after: Sequence[str] | None = None,
+    ) -> Any: ...
+
+    def get_table_sample(
+        self, size: int, seed: int, method: str = "system"
+    ) -> list[dict[str, Any]]: ...
+
+    def get_table_profile(
+        self, sample_size: int | None = None, seed: int = 0, approximate: bool = True
+    ) -> dict[str, Any]: ...
+
+    def stream_table_rows(
+        self,
+        after: Sequence[str] | None = None,
+        limit: int | None = None,
+        batch_size: int = 1000,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+    ) -> Iterator[Sequence[Any]]: ...
+
+
+class AsyncDatabase(Protocol):
+    async def get_table_names(self) -> list[str]: ...
+
+    async def get_table_schema(self) -> list[dict[str, Any]]: ...
+
+    async def get_schema_fingerprint(self) -> str | None: ...
+
+    async def get_catalog(self) -> list[dict[str, Any]]: ...
+
+    async def get_table_stats(self, exact: bool = False) -> dict[str, Any]: ...
+
+    async def get_table_rows(
+        self,
+        limit: int = 10,
+        format: RowFormat = "objects",
+        watermark: str | None = None,
+        since: str | None = None,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+        order: Sequence[str] | None = None,
+        after: Sequence[str] | None = None,
+    ) -> Any: ...
+
+    async def get_tables_rows(
+        self,
+        tables: dict[str, Sequence[str] | None],
+        limit: int = 10,
+        format: RowFormat = "objects",
+    ) -> dict[str, Any]: ...
+
+    async def get_table_sample(
+        self, size: int, seed: int, method: str = "system"
+    ) -> list[dict[str, Any]]: ...
+
+    async def get_table_profile(
+        self, sample_size: int | None = None, seed: int = 0, approximate: bool = True
+    ) -> dict[str, Any]: ...
 
 
 class DatabaseFactory:
@@ -17,7 +97,24 @@ class DatabaseFactory:
         self.__source_connection = source_connection
 
     def get_database(self) -> Database:
-        if self.__source_connection["type"] == "mysql":
-            return MySQLdb(self.__source_connection)
-        else:
-            return PostgreSQLdb(self.__source_connection)
+        type = self.__source_connection["type"]
+
+        with timed(STAGE_DURATION, "get_database", type):
+            if type == "mysql":
+                return MySQLdb(self.__source_connection)
+            else:
+                return PostgreSQLdb(self.__source_connection)
+
+
+class AsyncDatabaseFactory:
+    def __init__(self, source_connection: dict[str, Any]) -> None:
+        self.__source_connection = source_connection
+
+    def get_database(self) -> AsyncDatabase:
+        type = self.__source_connection["type"]
+
+        with timed(STAGE_DURATION, "get_database", type):
+            if type == "mysql":
+                return AsyncMySQLdb(self.__source_connection)
+            else:
+                return AsyncPostgreSQLdb(self.__source_connection)
@@ -0,0 +1,228 @@
+"""Process-wide registry of pooled source database engines."""
+
+import asyncio
+import hashlib
+import json
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
+from typing import Any, Iterator
+
+from sqlalchemy import Connection, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlmodel import create_engine
+
+from app import config
+from app.breakers import circuit_breakers
+from app.metrics import STAGE_DURATION, instrument, timed
+
+CONNECTION_FIELDS = (
+    "type",
+    "user",
+    "password",
+    "host",
+    "port",
+    "db",
+    "connect_timeout",
+    "statement_timeout",
+)
+
+
+def connection_key(source_connection: dict[str, Any]) -> tuple[int | None, str]:
+    """
+    Returns the key of a source connection.
+    Consists of the connection id and a hash of its connection fields,
+    so the password is never kept in clear.
+    """
+    fields = {field: source_connection.get(field) for field in CONNECTION_FIELDS}
+    fingerprint = hashlib.sha256(
+        json.dumps(fields, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+    return source_connection.get("id"), fingerprint
+
+
+def connect_timeout(source_connection: dict[str, Any]) -> int:
+    """
+    Returns the connect timeout of a source connection in seconds, 0 if none.
+    Defaults to SOURCE_CONNECT_TIMEOUT if not set.
+    """
+    value = source_connection.get("connect_timeout")
+    return config.SOURCE_CONNECT_TIMEOUT if value is None else value
+
+
+def statement_timeout(source_connection: dict[str, Any]) -> int:
+    """
+    Returns the statement timeout of a source connection in seconds, 0 if none.
+    Defaults to SOURCE_STATEMENT_TIMEOUT if not set.
+    """
+    value = source_connection.get("statement_timeout")
+    return config.SOURCE_STATEMENT_TIMEOUT if value is None else value
+
+
+def connect_args(source_connection: dict[str, Any], url: str) -> dict[str, Any]:
+    """
+    Returns the driver arguments applying the source connection timeouts.
+    MySQL statements are bounded by the read timeout of the client, or by the
+    async database classes, as older servers have no statement timeout.
+    """
+    driver = make_url(url).get_driver_name()
+    connect_seconds = connect_timeout(source_connection)
+    statement_milliseconds = statement_timeout(source_connection) * 1000
+    args: dict[str, Any] = {}
+
+    if connect_seconds:
+        args["timeout" if driver == "asyncpg" else "connect_timeout"] = connect_seconds
+
+    if statement_milliseconds:
+        if driver in ("psycopg2", "psycopg"):
+            args["options"] = f"-c statement_timeout={statement_milliseconds}"
+        elif driver == "asyncpg":
+            args["server_settings"] = {"statement_timeout": str(statement_milliseconds)}
+        elif driver == "pymysql":
+            args["read_timeout"] = statement_timeout(source_connection)
+
+    return args
+
+
+@contextmanager
+def connect(bind: Engine | Connection) -> Iterator[Connection]:
+    """Opens a connection of an engine, or reuses an already open connection."""
+    if isinstance(bind, Connection):
+        yield bind
+    else:
+        with timed(STAGE_DURATION, "checkout", bind.dialect.name):
+            connection = bind.connect()
+
+        with connection:
+            yield connection
+
+
+def dispose(engine: Engine | AsyncEngine) -> None:
+    """Disposes the connection pool of an engine."""
+    if isinstance(engine, AsyncEngine):
+        # pooled async connections belong to an event loop and can't be
+        # closed from here, they are dropped and garbage collected instead
+        engine.sync_engine.dispose(close=False)
+    else:
+        engine.dispose()
+
+
+class EngineRegistry:
+    """
+    Keeps one pooled engine per source connection and reuses it across requests.
+    Least recently used engines are disposed when the registry is full,
+    and engines that have been idle for too long are disposed on access.
+    Async engines are kept per event loop, as their connections can't be shared.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: int) -> None:
+        self.__max_size = max_size
+        self.__idle_timeout = idle_timeout
+        self.__engines: OrderedDict[tuple, tuple[Engine | AsyncEngine, float]] = (
+            OrderedDict()
+        )
+        self.__lock = Lock()
+
+    def __create_engine(
+        self, source_connection: dict[str, Any], url: str, is_async: bool
+    ) -> Engine | AsyncEngine:
+        engine = (create_async_engine if is_async else create_engine)(
+            url,
+            pool_size=config.SOURCE_POOL_SIZE,
+            max_overflow=config.SOURCE_MAX_OVERFLOW,
+            pool_pre_ping=config.SOURCE_POOL_PRE_PING,
+            pool_recycle=config.SOURCE_POOL_RECYCLE,
+            connect_args=connect_args(source_connection, url),
+        )
+        instrument(engine.sync_engine if is_async else engine)
+        circuit_breakers.guard(
+            engine.sync_engine if is_async else engine, source_connection
+        )
+
+        return engine
+
+    def __evict(self, now: float) -> list[Engine | AsyncEngine]:
+        evicted = []
+
+        for key, (engine, last_used) in list(self.__engines.items()):
+            if now - last_used > self.__idle_timeout:
+                evicted.append(engine)
+                del self.__engines[key]
+
+        while len(self.__engines) >= self.__max_size:
+            _, (engine, _) = self.__engines.popitem(last=False)
+            evicted.append(engine)
+
+        return evicted
+
+    def __get(
+        self, key: tuple, source_connection: dict[str, Any], url: str, is_async: bool
+    ) -> Engine | AsyncEngine:
+        now = monotonic()
+        evicted = []
+
+        with self.__lock:
+            if key in self.__engines:
+                engine, _ = self.__engines[key]
+                self.__engines.move_to_end(key)
+            else:
+                evicted = self.__evict(now)
+                engine = self.__create_engine(source_connection, url, is_async)
+
+            self.__engines[key] = (engine, now)
+
+        for evicted_engine in evicted:
+            dispose(evicted_engine)
+
+        return engine
+
+    def get_engine(self, source_connection: dict[str, Any], url: str) -> Engine:
+        """Returns the pooled engine of a source connection, creating it if needed."""
+        key = (*connection_key(source_connection), None)
+        return self.__get(key, source_connection, url, is_async=False)
+
+    def get_async_engine(
+        self, source_connection: dict[str, Any], url: str
+    ) -> AsyncEngine:
+        """
+        Returns the pooled async engine of a source connection for the running
+        event loop, creating it if needed.
+        """
+        key = (*connection_key(source_connection), asyncio.get_running_loop())
+        return self.__get(key, source_connection, url, is_async=True)
+
+    def engines(self) -> list[tuple[int, Engine]]:
+        """Returns the saved source connection id and sync engine of each engine."""
+        with self.__lock:
+            return [
+                (
+                    key[0],
+                    engine.sync_engine if isinstance(engine, AsyncEngine) else engine,
+                )
+                for key, (engine, _) in self.__engines.items()
+            ]
+
+    def dispose(self, id: int) -> None:
+        """Disposes every engine of a saved source connection."""
+        with self.__lock:
+            keys = [key for key in self.__engines if key[0] == id]
+            engines = [self.__engines.pop(key)[0] for key in keys]
+
+        for engine in engines:
+            dispose(engine)
+
+    def dispose_all(self) -> None:
+        """Disposes every engine in the registry."""
+        with self.__lock:
+            engines = [engine for engine, _ in self.__engines.values()]
+            self.__engines.clear()
+
+        for engine in engines:
+            dispose(engine)
+
+
+engine_registry = EngineRegistry(
+    max_size=config.ENGINE_REGISTRY_SIZE, idle_timeout=config.ENGINE_IDLE_TIMEOUT
+)
@@ -1,21 +1,56 @@
-from typing import Any
+import asyncio
+from random import Random
+from typing import Any, Callable, Sequence
 
-from sqlmodel import create_engine, inspect, text
+from fastapi import HTTPException
+from sqlalchemy import Connection, Engine, func, select
+from sqlalchemy.exc import DBAPIError, NoSuchTableError
+from sqlmodel import inspect, text
+
+from app import config
+from app.databases.engines import connect, engine_registry, statement_timeout
+from app.databases.profiles import profile_select, read_profile
+from app.databases.queries import (
+    Error,
+    filter_conditions,
+    filter_select,
+    get_watermark_column,
+    integer_key,
+    key_probe_select,
+    key_range_chunks,
+    keyset_select,
+    order_select,
+    project,
+    table_clause,
+    watermark_select,
+)
+from app.metrics import STAGE_DURATION, TimedInspector, timed, timed_iterator
+from app.serializers import RowFormat, shape_rows
+
+
+def _url(source_connection: dict[str, Any], driver: str) -> str:
+    user = source_connection["user"]
+    password = source_connection["password"]
+    host = source_connection["host"]
+    port = source_connection["port"]
+    db = source_connection["db"]
+    return f"mysql+{driver}://{user}:{password}@{host}:{port}/{db}"
 
 
 class MySQLdb:
-    def __init__(self, source_connection: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        source_connection: dict[str, Any],
+        bind: Engine | Connection | None = None,
+    ) -> None:
         self.__table = source_connection["table_name"]
 
-        user = source_connection["user"]
-        password = source_connection["password"]
-        host = source_connection["host"]
-        port = source_connection["port"]
-        db = source_connection["db"]
-        url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{db}"
+        if bind is None:
+            url = _url(source_connection, "pymysql")
+            bind = engine_registry.get_engine(source_connection, url)
 
-        self.__engine = create_engine(url)
-        self.__inspector = inspect(self.__engine)
+        self.__bind = bind
+        self.__inspector = TimedInspector(inspect(self.__bind), "mysql")
 
     def get_table_names(self):
         """Returns available table names."""
@@ -35,11 +70,505 @@ class MySQLdb:
             for column in columns
         ]
 
-    def get_table_rows(self, limit: int = 10):
-        """Returns table rows."""
-        with self.__engine.connect() as session:
-            columns = self.__inspector.get_columns(self.__table)
-            column_names = [column["name"] for column in columns]
-            statement = f"SELECT * FROM {self.__table} LIMIT {limit}"
-            rows = session.execute(text(statement)).all()
-            return [dict(zip(column_names, row)) for row in rows]
+    def get_schema_fingerprint(self):
+        """
+        Returns a hash of the table columns, their types, nullability, defaults
+        and keys, read from information_schema in one query.
+        Row hashes are combined with XOR, which group_concat_max_len can't cut.
+        """
+        with connect(self.__bind) as session:
+            statement = (
+                "SELECT CONCAT(COUNT(*), '-', BIT_XOR(CAST(CONV(LEFT(MD5(CONCAT_WS("
+                "' ', ORDINAL_POSITION, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, "
+                "COLUMN_DEFAULT, COLUMN_KEY, EXTRA)), 16), 16, 10) AS UNSIGNED))) "
+                "FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            )
+            return session.execute(text(statement), {"table": self.__table}).scalar()
+
+    def get_catalog(self):
+        """
+        Returns every table of the database with its columns, keys, indexes and
+        estimated row count, read from information_schema in four queries.
+        """
+        with connect(self.__bind) as session:
+            tables = session.execute(
+                text(
+                    "SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE' "
+                    "ORDER BY TABLE_NAME"
+                )
+            ).all()
+            columns = session.execute(
+                text(
+                    "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, "
+                    "COLUMN_DEFAULT, COLUMN_KEY FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() "
+                    "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+                )
+            ).all()
+            key_columns = session.execute(
+                text(
+                    "SELECT TABLE_NAME, CONSTRAINT_NAME, COLUMN_NAME, "
+                    "REFERENCED_TABLE_SCHEMA, REFERENCED_TABLE_NAME, "
+                    "REFERENCED_COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND (CONSTRAINT_NAME = 'PRIMARY' "
+                    "OR REFERENCED_TABLE_NAME IS NOT NULL) "
+                    "ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION"
+                )
+            ).all()
+            index_columns = session.execute(
+                text(
+                    "SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME, NON_UNIQUE "
+                    "FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME <> 'PRIMARY' "
+                    "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+                )
+            ).all()
+
+        catalog = {
+            table: {
+                "name": table,
+                "columns": [],
+                "primary_key": [],
+                "foreign_keys": {},
+                "indexes": {},
+                "row_estimate": row_estimate,
+            }
+            for table, row_estimate in tables
+        }
+
+        for table, name, column_type, nullable, default, key in columns:
+            if table in catalog:
+                catalog[table]["columns"].append(
+                    {
+                        "name": name,
+                        "type": column_type.upper(),
+                        "nullable": nullable == "YES",
+                        "default": default,
+                        "primary_key": key == "PRI",
+                    }
+                )
+
+        for table, name, column, ref_schema, ref_table, ref_column in key_columns:
+            if table not in catalog:
+                continue
+            if name == "PRIMARY":
+                catalog[table]["primary_key"].append(column)
+                continue
+            foreign_key = catalog[table]["foreign_keys"].setdefault(
+                name,
+                {
+                    "name": name,
+                    "constrained_columns": [],
+                    "referred_schema": ref_schema,
+                    "referred_table": ref_table,
+                    "referred_columns": [],
+                },
+            )
+            foreign_key["constrained_columns"].append(column)
+            foreign_key["referred_columns"].append(ref_column)
+
+        for table, name, column, non_unique in index_columns:
+            if table in catalog:
+                index = catalog[table]["indexes"].setdefault(
+                    name, {"name": name, "column_names": [], "unique": not non_unique}
+                )
+                index["column_names"].append(column)
+
+        for table in catalog.values():
+            table["foreign_keys"] = list(table["foreign_keys"].values())
+            table["indexes"] = list(table["indexes"].values())
+
+        return list(catalog.values())
+
+    def get_table_stats(self, exact: bool = False):
+        """
+        Returns estimated row count, on-disk size and last analyzed time of table,
+        read from information_schema. Counts rows exactly if asked to.
+        """
+        with connect(self.__bind) as session:
+            statement = (
+                "SELECT TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH "
+                "FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            )
+            stats = session.execute(text(statement), {"table": self.__table}).first()
+            row_estimate, total_bytes = stats or (None, None)
+
+            # persistent statistics are only readable with privileges on mysql
+            try:
+                statement = (
+                    "SELECT last_update FROM mysql.innodb_table_stats "
+                    "WHERE database_name = DATABASE() AND table_name = :table"
+                )
+                last_analyzed = session.execute(
+                    text(statement), {"table": self.__table}
+                ).scalar()
+            except DBAPIError:
+                last_analyzed = None
+
+            table_stats = {
+                "table": self.__table,
+                "row_estimate": row_estimate,
+                "total_bytes": total_bytes,
+                "last_analyzed": last_analyzed,
+            }
+
+            if exact:
+                statement = select(func.count()).select_from(
+                    table_clause(self.__table, None, [])
+                )
+                table_stats["exact_row_count"] = session.execute(statement).scalar()
+
+            return table_stats
+
+    def get_table_columns(self):
+        """Returns reflected table columns."""
+        return self.__inspector.get_columns(self.__table)
+
+    def get_table_rows(
+        self,
+        limit: int = 10,
+        format: RowFormat = "objects",
+        watermark: str | None = None,
+        since: str | None = None,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+        order: Sequence[str] | None = None,
+        after: Sequence[str] | None = None,
+    ):
+        """
+        Returns table rows, as objects or as arrays after the column types.
+        Rows follow the watermark column order, after since if given, and
+        after the row of the primary key values too if given, then the given
+        order. Only the given columns of rows matching the filters are returned,
+        which must include the watermark and primary key columns if watermarked.
+        """
+        with connect(self.__bind) as session:
+            table_columns = self.__inspector.get_columns(self.__table)
+            table_ = table_clause(self.__table, None, table_columns)
+
+            if watermark is None:
+                statement = filter_select(select(table_).limit(limit), table_, filters)
+                cursor = []
+            else:
+                pk_constraint = self.__inspector.get_pk_constraint(self.__table)
+                statement = watermark_select(
+                    table_,
+                    watermark,
+                    pk_constraint["constrained_columns"],
+                    since,
+                    limit=limit,
+                    after=after,
+                    where=filter_conditions(table_, filters),
+                )
+                cursor = [watermark, *pk_constraint["constrained_columns"]]
+
+            statement = order_select(statement, table_, order)
+            projected_columns = project(table_columns, columns, cursor)
+            statement = statement.with_only_columns(
+                *[table_.c[column["name"]] for column in projected_columns]
+            )
+
+            with timed(STAGE_DURATION, "fetch", "mysql"):
+                rows = session.execute(statement).all()
+
+            return shape_rows(projected_columns, rows, format)
+
+    def get_watermark(self, watermark: str):
+        """Returns the highest value of a watermark column."""
+        columns = self.__inspector.get_columns(self.__table)
+        table_ = table_clause(self.__table, None, columns)
+        watermark_column = get_watermark_column(table_, watermark)
+
+        with connect(self.__bind) as session:
+            return session.execute(select(func.max(watermark_column))).scalar()
+
+    def stream_changed_rows(
+        self,
+        watermark: str,
+        since: str | None = None,
+        until: Any = None,
+        batch_size: int = 1000,
+    ):
+        """
+        Returns table rows whose watermark column is after since and up to until
+        in batches, in watermark order.
+        """
+        columns = self.__inspector.get_columns(self.__table)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table)
+        statement = watermark_select(
+            table_clause(self.__table, None, columns),
+            watermark,
+            pk_constraint["constrained_columns"],
+            since,
+            until,
+        )
+        return self.__stream(statement, batch_size)
+
+    def get_table_sample(self, size: int, seed: int, method: str = "system"):
+        """
+        Returns about size random table rows read as short runs from random
+        primary key values. The sampling method only applies to PostgreSQL.
+        """
+        table_, key_column = self.__sampling_table()
+
+        with connect(self.__bind) as session:
+            statement = self.__sample_select(session, table_, key_column, size, seed)
+            rows = session.execute(statement).all()
+
+        # runs of close random keys overlap
+        rows = list({row._mapping[key_column.name]: row for row in rows}.values())
+
+        if len(rows) > size:
+            rows = Random(seed).sample(rows, size)
+
+        return [row._asdict() for row in rows]
+
+    def get_table_profile(
+        self,
+        sample_size: int | None = None,
+        seed: int = 0,
+        approximate: bool = True,
+    ):
+        """
+        Returns the row count and per column null count, distinct count, min,
+        max and average length, computed by one aggregate query over the table
+        or a sample of it. Distinct counts of the whole table are read from
+        index cardinalities where indexed if approximate.
+        """
+        columns = self.__inspector.get_columns(self.__table)
+        table_ = table_clause(self.__table, None, columns)
+        estimates = {}
+
+        with connect(self.__bind) as session:
+            if sample_size is None and approximate:
+                statement = (
+                    "SELECT COLUMN_NAME, MAX(CARDINALITY) "
+                    "FROM information_schema.STATISTICS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                    "AND SEQ_IN_INDEX = 1 AND CARDINALITY IS NOT NULL "
+                    "GROUP BY COLUMN_NAME"
+                )
+                estimates = dict(
+                    session.execute(text(statement), {"table": self.__table}).all()
+                )
+
+            if sample_size is None:
+                from_ = table_
+            else:
+                table_, key_column = self.__sampling_table()
+                from_ = self.__sample_select(
+                    session, table_, key_column, sample_size, seed
+                ).subquery()
+
+            exact_distinct = {column["name"] for column in columns} - estimates.keys()
+            row = session.execute(profile_select(from_, columns, exact_distinct)).one()
+
+        return read_profile(columns, row, estimates, sample_size is not None)
+
+    def __sampling_table(self):
+        columns = self.__inspector.get_columns(self.__table)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table)
+        table_ = table_clause(self.__table, None, columns)
+        key_column = integer_key(table_, pk_constraint["constrained_columns"])
+
+        if key_column is None:
+            raise HTTPException(status_code=422, detail=Error.NO_SAMPLING_KEY_ERROR)
+
+        return table_, key_column
+
+    def __sample_select(
+        self, session: Connection, table_, key_column, size: int, seed: int
+    ):
+        low, high = session.execute(
+            select(func.min(key_column), func.max(key_column))
+        ).one()
+
+        if low is None:
+            return select(table_)
+
+        return key_probe_select(table_, key_column, low, high, size, seed)
+
+    def stream_table_rows(
+        self,
+        after: Sequence[str] | None = None,
+        limit: int | None = None,
+        batch_size: int = 1000,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+    ):
+        """
+        Returns table rows in batches ordered by primary key.
+        Rows are read through a server-side cursor and start after the cursor if given.
+        Only the given columns of rows matching the filters are returned, which
+        must include the primary key columns.
+        """
+        table_columns = self.__inspector.get_columns(self.__table)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table)
+        table_ = table_clause(self.__table, None, table_columns)
+        statement = keyset_select(
+            table_, pk_constraint["constrained_columns"], after, limit
+        )
+        statement = filter_select(statement, table_, filters)
+        statement = statement.with_only_columns(
+            *[
+                table_.c[column["name"]]
+                for column in project(
+                    table_columns, columns, pk_constraint["constrained_columns"]
+                )
+            ]
+        )
+        return self.__stream(statement, batch_size)
+
+    def get_table_chunks(self, chunk_size: int = 10000):
+        """
+        Returns selects splitting the table into primary key ranges of about
+        chunk_size rows, of chunk_size key values before MySQL 8 which has no
+        window functions. Tables without an integer primary key make one chunk.
+        """
+        columns = self.__inspector.get_columns(self.__table)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table)
+        table_ = table_clause(self.__table, None, columns)
+
+        with connect(self.__bind) as session:
+            chunks = key_range_chunks(
+                session,
+                table_,
+                pk_constraint["constrained_columns"],
+                chunk_size,
+                ranked=session.dialect.server_version_info >= (8,),
+            )
+
+        return chunks or [select(table_)]
+
+    def get_chunk_rows(self, chunk):
+        """Returns table rows of a chunk."""
+        with connect(self.__bind) as session, timed(STAGE_DURATION, "fetch", "mysql"):
+            return session.execute(chunk).all()
+
+    def __stream(self, statement, batch_size: int):
+        with connect(self.__bind) as session:
+            result = session.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(statement)
+            yield from timed_iterator(
+                result.partitions(), STAGE_DURATION, "fetch", "mysql"
+            )
+
+
+class AsyncMySQLdb:
+    """
+    Async variant of MySQLdb, backed by an async engine.
+    Each call checks out one async connection and runs MySQLdb on it,
+    within the statement timeout as aiomysql has no read timeout.
+    """
+
+    def __init__(self, source_connection: dict[str, Any]) -> None:
+        self.__source_connection = source_connection
+        self.__timeout = statement_timeout(source_connection) or None
+
+        url = _url(source_connection, "aiomysql")
+        self.__engine = engine_registry.get_async_engine(source_connection, url)
+
+    async def __run(
+        self, method: Callable[[MySQLdb], Any], table_name: str | None = None
+    ):
+        source_connection = self.__source_connection
+
+        if table_name is not None:
+            source_connection = {**source_connection, "table_name": table_name}
+
+        async with asyncio.timeout(self.__timeout):
+            async with self.__engine.connect() as connection:
+                return await connection.run_sync(
+                    lambda session: method(MySQLdb(source_connection, session))
+                )
+
+    async def get_table_names(self):
+        """Returns available table names."""
+        return await self.__run(MySQLdb.get_table_names)
+
+    async def get_table_schema(self):
+        """Returns table information."""
+        return await self.__run(MySQLdb.get_table_schema)
+
+    async def get_schema_fingerprint(self):
+        """Returns a hash of the table columns."""
+        return await self.__run(MySQLdb.get_schema_fingerprint)
+
+    async def get_catalog(self):
+        """Returns every table of the database with keys, indexes and row estimates."""
+        return await self.__run(MySQLdb.get_catalog)
+
+    async def get_table_stats(self, exact: bool = False):
+        """Returns estimated row count, on-disk size and last analyzed time of table."""
+        return await self.__run(lambda database: database.get_table_stats(exact))
+
+    async def get_table_rows(
+        self,
+        limit: int = 10,
+        format: RowFormat = "objects",
+        watermark: str | None = None,
+        since: str | None = None,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+        order: Sequence[str] | None = None,
+        after: Sequence[str] | None = None,
+    ):
+        """Returns table rows, as objects or as arrays after the column types."""
+        return await self.__run(
+            lambda database: database.get_table_rows(
+                limit, format, watermark, since, columns, filters, order, after
+            )
+        )
+
+    async def get_tables_rows(
+        self,
+        tables: dict[str, Sequence[str] | None],
+        limit: int = 10,
+        format: RowFormat = "objects",
+    ):
+        """
+        Returns rows of many tables keyed by table, only of the given columns
+        if any. Tables are fetched concurrently over the pooled engine, at most
+        as many at once as the pool keeps connections.
+        """
+        semaphore = asyncio.Semaphore(config.SOURCE_POOL_SIZE)
+
+        async def get_rows(table_name: str, columns: Sequence[str] | None):
+            async with semaphore:
+                try:
+                    return await self.__run(
+                        lambda database: database.get_table_rows(
+                            limit, format, columns=columns
+                        ),
+                        table_name,
+                    )
+                except NoSuchTableError:
+                    raise HTTPException(
+                        status_code=422, detail=Error.UNKNOWN_TABLE_ERROR
+                    )
+
+        rows = await asyncio.gather(
+            *[get_rows(table_name, columns) for table_name, columns in tables.items()]
+        )
+        return dict(zip(tables, rows))
+
+    async def get_table_sample(self, size: int, seed: int, method: str = "system"):
+        """Returns about size random table rows."""
+        return await self.__run(
+            lambda database: database.get_table_sample(size, seed, method)
+        )
+
+    async def get_table_profile(
+        self,
+        sample_size: int | None = None,
+        seed: int = 0,
+        approximate: bool = True,
+    ):
+        """Returns per column statistics of the table or a sample of it."""
+        return await self.__run(
+            lambda database: database.get_table_profile(sample_size, seed, approximate)
+        )
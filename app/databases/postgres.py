@@ -1,23 +1,59 @@
-from typing import Any
+import asyncio
+from math import ceil
+from random import Random
+from typing import Any, Callable, Sequence
 
+from fastapi import HTTPException
+from sqlalchemy import Connection, Engine, func, select
 from sqlalchemy.exc import ArgumentError, NoSuchTableError, OperationalError
-from sqlmodel import Session, create_engine, inspect, text
+from sqlmodel import Session, inspect, text
+
+from app import config
+from app.databases.engines import connect, engine_registry
+from app.databases.profiles import profile_select, read_profile
+from app.databases.queries import (
+    SAMPLE_OVERSAMPLING,
+    Error,
+    block_range_chunks,
+    filter_conditions,
+    filter_select,
+    get_watermark_column,
+    key_range_chunks,
+    keyset_select,
+    order_select,
+    project,
+    table_clause,
+    tablesample_select,
+    watermark_select,
+)
+from app.metrics import STAGE_DURATION, TimedInspector, timed, timed_iterator
+from app.serializers import RowFormat, shape_rows
+
+
+def _url(source_connection: dict[str, Any], driver: str) -> str:
+    user = source_connection["user"]
+    password = source_connection["password"]
+    host = source_connection["host"]
+    port = source_connection["port"]
+    db = source_connection["db"]
+    return f"postgresql+{driver}://{user}:{password}@{host}:{port}/{db}"
 
 
 class PostgreSQLdb:
-    def __init__(self, source_connection: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        source_connection: dict[str, Any],
+        bind: Engine | Connection | None = None,
+    ) -> None:
         self.__table = source_connection["table_name"]
         self.__schema = source_connection["schema_name"]
 
-        user = source_connection["user"]
-        password = source_connection["password"]
-        host = source_connection["host"]
-        port = source_connection["port"]
-        db = source_connection["db"]
-        url = f"postgresql://{user}:{password}@{host}:{port}/{db}"
+        if bind is None:
+            url = _url(source_connection, "psycopg2")
+            bind = engine_registry.get_engine(source_connection, url)
 
-        self.__engine = create_engine(url)
-        self.__inspector = inspect(self.__engine)
+        self.__bind = bind
+        self.__inspector = TimedInspector(inspect(self.__bind), "postgresql")
 
     def get_table_names(self):
         """Returns available table names."""
@@ -37,11 +73,486 @@ class PostgreSQLdb:
             for column in columns
         ]
 
-    def get_table_rows(self, limit: int = 10):
-        """Returns table rows."""
-        with self.__engine.connect() as session:
-            columns = self.__inspector.get_columns(self.__table, self.__schema)
-            column_names = [column["name"] for column in columns]
-            statement = f"SELECT * FROM {self.__schema}.{self.__table} LIMIT {limit}"
-            rows = session.execute(text(statement)).all()
-            return [dict(zip(column_names, row)) for row in rows]
+    def get_schema_fingerprint(self):
+        """
+        Returns a hash of the table columns, their types, nullability, defaults
+        and primary key membership, read from the catalog in one query.
+        """
+        with connect(self.__bind) as session:
+            statement = (
+                "SELECT md5(string_agg(concat_ws(' ', a.attname, "
+                "format_type(a.atttypid, a.atttypmod), a.attnotnull, "
+                "pg_get_expr(d.adbin, d.adrelid), a.attnum = ANY(i.indkey)), "
+                "',' ORDER BY a.attnum)) "
+                "FROM pg_catalog.pg_attribute a "
+                "JOIN pg_catalog.pg_class c ON c.oid = a.attrelid "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                "LEFT JOIN pg_catalog.pg_attrdef d "
+                "ON d.adrelid = a.attrelid AND d.adnum = a.attnum "
+                "LEFT JOIN pg_catalog.pg_index i "
+                "ON i.indrelid = c.oid AND i.indisprimary "
+                "WHERE n.nspname = :schema AND c.relname = :table "
+                "AND a.attnum > 0 AND NOT a.attisdropped"
+            )
+            return session.execute(
+                text(statement), {"schema": self.__schema, "table": self.__table}
+            ).scalar()
+
+    def get_catalog(self):
+        """
+        Returns every table of the schema with its columns, keys, indexes and
+        estimated row count, reflected for all tables at once.
+        """
+        columns = self.__inspector.get_multi_columns(self.__schema)
+        pk_constraints = self.__inspector.get_multi_pk_constraint(self.__schema)
+        foreign_keys = self.__inspector.get_multi_foreign_keys(self.__schema)
+        indexes = self.__inspector.get_multi_indexes(self.__schema)
+
+        with connect(self.__bind) as session:
+            statement = (
+                "SELECT c.relname, "
+                "CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END "
+                "FROM pg_catalog.pg_class c "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = :schema AND c.relkind IN ('r', 'p')"
+            )
+            row_estimates = dict(
+                session.execute(text(statement), {"schema": self.__schema}).all()
+            )
+
+        catalog = []
+        for key, table_columns in sorted(columns.items()):
+            primary_key = pk_constraints[key]["constrained_columns"]
+            catalog.append(
+                {
+                    "name": key[1],
+                    "columns": [
+                        {
+                            "name": column["name"],
+                            "type": str(column["type"]),
+                            "nullable": column["nullable"],
+                            "default": column["default"],
+                            "primary_key": column["name"] in primary_key,
+                        }
+                        for column in table_columns
+                    ],
+                    "primary_key": primary_key,
+                    "foreign_keys": [
+                        {
+                            "name": foreign_key["name"],
+                            "constrained_columns": foreign_key["constrained_columns"],
+                            "referred_schema": foreign_key["referred_schema"],
+                            "referred_table": foreign_key["referred_table"],
+                            "referred_columns": foreign_key["referred_columns"],
+                        }
+                        for foreign_key in foreign_keys[key]
+                    ],
+                    "indexes": [
+                        {
+                            "name": index["name"],
+                            "column_names": index["column_names"],
+                            "unique": index["unique"],
+                        }
+                        for index in indexes[key]
+                    ],
+                    "row_estimate": row_estimates.get(key[1]),
+                }
+            )
+
+        return catalog
+
+    def get_table_stats(self, exact: bool = False):
+        """
+        Returns estimated row count, on-disk size and last analyzed time of table,
+        read from catalog statistics. Counts rows exactly if asked to.
+        """
+        with connect(self.__bind) as session:
+            statement = (
+                "SELECT "
+                "CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END, "
+                "pg_catalog.pg_total_relation_size(c.oid), "
+                "GREATEST(s.last_analyze, s.last_autoanalyze) "
+                "FROM pg_catalog.pg_class c "
+                "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                "LEFT JOIN pg_catalog.pg_stat_all_tables s ON s.relid = c.oid "
+                "WHERE n.nspname = :schema AND c.relname = :table"
+            )
+            stats = session.execute(
+                text(statement), {"schema": self.__schema, "table": self.__table}
+            ).first()
+            row_estimate, total_bytes, last_analyzed = stats or (None, None, None)
+            table_stats = {
+                "table": self.__table,
+                "row_estimate": row_estimate,
+                "total_bytes": total_bytes,
+                "last_analyzed": last_analyzed,
+            }
+
+            if exact:
+                statement = select(func.count()).select_from(
+                    table_clause(self.__table, self.__schema, [])
+                )
+                table_stats["exact_row_count"] = session.execute(statement).scalar()
+
+            return table_stats
+
+    def get_table_columns(self):
+        """Returns reflected table columns."""
+        return self.__inspector.get_columns(self.__table, self.__schema)
+
+    def get_table_rows(
+        self,
+        limit: int = 10,
+        format: RowFormat = "objects",
+        watermark: str | None = None,
+        since: str | None = None,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+        order: Sequence[str] | None = None,
+        after: Sequence[str] | None = None,
+    ):
+        """
+        Returns table rows, as objects or as arrays after the column types.
+        Rows follow the watermark column order, after since if given, and
+        after the row of the primary key values too if given, then the given
+        order. Only the given columns of rows matching the filters are returned,
+        which must include the watermark and primary key columns if watermarked.
+        """
+        with connect(self.__bind) as session:
+            table_columns = self.__inspector.get_columns(self.__table, self.__schema)
+            table_ = table_clause(self.__table, self.__schema, table_columns)
+
+            if watermark is None:
+                statement = filter_select(select(table_).limit(limit), table_, filters)
+                cursor = []
+            else:
+                pk_constraint = self.__inspector.get_pk_constraint(
+                    self.__table, self.__schema
+                )
+                statement = watermark_select(
+                    table_,
+                    watermark,
+                    pk_constraint["constrained_columns"],
+                    since,
+                    limit=limit,
+                    after=after,
+                    where=filter_conditions(table_, filters),
+                )
+                cursor = [watermark, *pk_constraint["constrained_columns"]]
+
+            statement = order_select(statement, table_, order)
+            projected_columns = project(table_columns, columns, cursor)
+            statement = statement.with_only_columns(
+                *[table_.c[column["name"]] for column in projected_columns]
+            )
+
+            with timed(STAGE_DURATION, "fetch", "postgresql"):
+                rows = session.execute(statement).all()
+
+            return shape_rows(projected_columns, rows, format)
+
+    def get_watermark(self, watermark: str):
+        """Returns the highest value of a watermark column."""
+        columns = self.__inspector.get_columns(self.__table, self.__schema)
+        table_ = table_clause(self.__table, self.__schema, columns)
+        watermark_column = get_watermark_column(table_, watermark)
+
+        with connect(self.__bind) as session:
+            return session.execute(select(func.max(watermark_column))).scalar()
+
+    def stream_changed_rows(
+        self,
+        watermark: str,
+        since: str | None = None,
+        until: Any = None,
+        batch_size: int = 1000,
+    ):
+        """
+        Returns table rows whose watermark column is after since and up to until
+        in batches, in watermark order.
+        """
+        columns = self.__inspector.get_columns(self.__table, self.__schema)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table, self.__schema)
+        statement = watermark_select(
+            table_clause(self.__table, self.__schema, columns),
+            watermark,
+            pk_constraint["constrained_columns"],
+            since,
+            until,
+        )
+        return self.__stream(statement, batch_size)
+
+    def get_table_sample(self, size: int, seed: int, method: str = "system"):
+        """
+        Returns about size random table rows read with TABLESAMPLE, sized after
+        the catalog row estimate. SYSTEM samples whole pages and only reads
+        those, BERNOULLI samples rows but scans the whole table.
+        """
+        columns = self.__inspector.get_columns(self.__table, self.__schema)
+        table_ = table_clause(self.__table, self.__schema, columns)
+
+        with connect(self.__bind) as session:
+            statement = self.__sample_select(session, table_, size, seed, method)
+            rows = session.execute(statement).all()
+
+        if len(rows) > size:
+            rows = Random(seed).sample(rows, size)
+
+        return [row._asdict() for row in rows]
+
+    def get_table_profile(
+        self,
+        sample_size: int | None = None,
+        seed: int = 0,
+        approximate: bool = True,
+    ):
+        """
+        Returns the row count and per column null count, distinct count, min,
+        max and average length, computed by one aggregate query over the table
+        or a sample of it. Distinct counts of the whole table are read from
+        pg_stats where analyzed if approximate.
+        """
+        columns = self.__inspector.get_columns(self.__table, self.__schema)
+        table_ = table_clause(self.__table, self.__schema, columns)
+        estimates = {}
+
+        with connect(self.__bind) as session:
+            if sample_size is None and approximate:
+                statement = (
+                    "SELECT attname, n_distinct FROM pg_catalog.pg_stats "
+                    "WHERE schemaname = :schema AND tablename = :table"
+                )
+                estimates = dict(
+                    session.execute(
+                        text(statement),
+                        {"schema": self.__schema, "table": self.__table},
+                    ).all()
+                )
+
+            from_ = (
+                table_
+                if sample_size is None
+                else self.__sample_select(
+                    session, table_, sample_size, seed, "system"
+                ).subquery()
+            )
+            exact_distinct = {column["name"] for column in columns} - estimates.keys()
+            row = session.execute(profile_select(from_, columns, exact_distinct)).one()
+
+        return read_profile(columns, row, estimates, sample_size is not None)
+
+    def __sample_select(
+        self, session: Connection, table_, size: int, seed: int, method: str
+    ):
+        statement = (
+            "SELECT c.reltuples FROM pg_catalog.pg_class c "
+            "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = :schema AND c.relname = :table"
+        )
+        row_estimate = session.execute(
+            text(statement), {"schema": self.__schema, "table": self.__table}
+        ).scalar()
+        percent = (
+            min(100.0, 100.0 * size * SAMPLE_OVERSAMPLING / row_estimate)
+            if row_estimate and row_estimate > 0
+            else 100.0
+        )
+        return tablesample_select(table_, method, percent, seed, size * 4)
+
+    def stream_table_rows(
+        self,
+        after: Sequence[str] | None = None,
+        limit: int | None = None,
+        batch_size: int = 1000,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+    ):
+        """
+        Returns table rows in batches ordered by primary key.
+        Rows are read through a server-side cursor and start after the cursor if given.
+        Only the given columns of rows matching the filters are returned, which
+        must include the primary key columns.
+        """
+        table_columns = self.__inspector.get_columns(self.__table, self.__schema)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table, self.__schema)
+        table_ = table_clause(self.__table, self.__schema, table_columns)
+        statement = keyset_select(
+            table_, pk_constraint["constrained_columns"], after, limit
+        )
+        statement = filter_select(statement, table_, filters)
+        statement = statement.with_only_columns(
+            *[
+                table_.c[column["name"]]
+                for column in project(
+                    table_columns, columns, pk_constraint["constrained_columns"]
+                )
+            ]
+        )
+        return self.__stream(statement, batch_size)
+
+    def get_table_chunks(self, chunk_size: int = 10000):
+        """
+        Returns selects splitting the table into primary key ranges of about
+        chunk_size rows. Tables without an integer primary key are split into
+        heap block ranges by ctid instead, on PostgreSQL 14 and later where
+        ctid ranges are TID range scans, else read as a single chunk.
+        """
+        columns = self.__inspector.get_columns(self.__table, self.__schema)
+        pk_constraint = self.__inspector.get_pk_constraint(self.__table, self.__schema)
+        table_ = table_clause(self.__table, self.__schema, columns)
+
+        with connect(self.__bind) as session:
+            chunks = key_range_chunks(
+                session, table_, pk_constraint["constrained_columns"], chunk_size
+            )
+
+            if chunks is None and session.dialect.server_version_info < (14,):
+                chunks = [select(table_)]
+            elif chunks is None:
+                statement = (
+                    "SELECT pg_catalog.pg_relation_size(c.oid) "
+                    "/ current_setting('block_size')::bigint, c.reltuples "
+                    "FROM pg_catalog.pg_class c "
+                    "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                    "WHERE n.nspname = :schema AND c.relname = :table"
+                )
+                pages, row_estimate = session.execute(
+                    text(statement), {"schema": self.__schema, "table": self.__table}
+                ).one()
+                pages_per_chunk = (
+                    ceil(chunk_size * pages / row_estimate)
+                    if row_estimate > 0
+                    else pages
+                )
+                chunks = block_range_chunks(table_, pages, pages_per_chunk)
+
+        return chunks
+
+    def get_chunk_rows(self, chunk):
+        """Returns table rows of a chunk."""
+        with connect(self.__bind) as session, timed(
+            STAGE_DURATION, "fetch", "postgresql"
+        ):
+            return session.execute(chunk).all()
+
+    def __stream(self, statement, batch_size: int):
+        with connect(self.__bind) as session:
+            result = session.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(statement)
+            yield from timed_iterator(
+                result.partitions(), STAGE_DURATION, "fetch", "postgresql"
+            )
+
+
+class AsyncPostgreSQLdb:
+    """
+    Async variant of PostgreSQLdb, backed by an async engine.
+    Each call checks out one async connection and runs PostgreSQLdb on it.
+    """
+
+    def __init__(self, source_connection: dict[str, Any]) -> None:
+        self.__source_connection = source_connection
+
+        url = _url(source_connection, "asyncpg")
+        self.__engine = engine_registry.get_async_engine(source_connection, url)
+
+    async def __run(
+        self, method: Callable[[PostgreSQLdb], Any], table_name: str | None = None
+    ):
+        source_connection = self.__source_connection
+
+        if table_name is not None:
+            source_connection = {**source_connection, "table_name": table_name}
+
+        async with self.__engine.connect() as connection:
+            return await connection.run_sync(
+                lambda session: method(PostgreSQLdb(source_connection, session))
+            )
+
+    async def get_table_names(self):
+        """Returns available table names."""
+        return await self.__run(PostgreSQLdb.get_table_names)
+
+    async def get_table_schema(self):
+        """Returns table information."""
+        return await self.__run(PostgreSQLdb.get_table_schema)
+
+    async def get_schema_fingerprint(self):
+        """Returns a hash of the table columns."""
+        return await self.__run(PostgreSQLdb.get_schema_fingerprint)
+
+    async def get_catalog(self):
+        """Returns every table of the schema with keys, indexes and row estimates."""
+        return await self.__run(PostgreSQLdb.get_catalog)
+
+    async def get_table_stats(self, exact: bool = False):
+        """Returns estimated row count, on-disk size and last analyzed time of table."""
+        return await self.__run(lambda database: database.get_table_stats(exact))
+
+    async def get_table_rows(
+        self,
+        limit: int = 10,
+        format: RowFormat = "objects",
+        watermark: str | None = None,
+        since: str | None = None,
+        columns: Sequence[str] | None = None,
+        filters: Sequence[str] | None = None,
+        order: Sequence[str] | None = None,
+        after: Sequence[str] | None = None,
+    ):
+        """Returns table rows, as objects or as arrays after the column types."""
+        return await self.__run(
+            lambda database: database.get_table_rows(
+                limit, format, watermark, since, columns, filters, order, after
+            )
+        )
+
+    async def get_tables_rows(
+        self,
+        tables: dict[str, Sequence[str] | None],
+        limit: int = 10,
+        format: RowFormat = "objects",
+    ):
+        """
+        Returns rows of many tables keyed by table, only of the given columns
+        if any. Tables are fetched concurrently over the pooled engine, at most
+        as many at once as the pool keeps connections.
+        """
+        semaphore = asyncio.Semaphore(config.SOURCE_POOL_SIZE)
+
+        async def get_rows(table_name: str, columns: Sequence[str] | None):
+            async with semaphore:
+                try:
+                    return await self.__run(
+                        lambda database: database.get_table_rows(
+                            limit, format, columns=columns
+                        ),
+                        table_name,
+                    )
+                except NoSuchTableError:
+                    raise HTTPException(
+                        status_code=422, detail=Error.UNKNOWN_TABLE_ERROR
+                    )
+
+        rows = await asyncio.gather(
+            *[get_rows(table_name, columns) for table_name, columns in tables.items()]
+        )
+        return dict(zip(tables, rows))
+
+    async def get_table_sample(self, size: int, seed: int, method: str = "system"):
+        """Returns about size random table rows."""
+        return await self.__run(
+            lambda database: database.get_table_sample(size, seed, method)
+        )
+
+    async def get_table_profile(
+        self,
+        sample_size: int | None = None,
+        seed: int = 0,
+        approximate: bool = True,
+    ):
+        """Returns per column statistics of the table or a sample of it."""
+        return await self.__run(
+            lambda database: database.get_table_profile(sample_size, seed, approximate)
+        )
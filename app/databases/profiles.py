@@ -0,0 +1,101 @@
+"""Single pass column profiling statements shared by the source databases."""
+
+from typing import Any
+
+from sqlalchemy import FromClause, func, select, types
+from sqlalchemy.sql import Select
+
+
+def _comparable(type_: Any) -> bool:
+    return not isinstance(type_, (types.JSON, types.ARRAY, types.NullType))
+
+
+# types whose min and max are meaningful, others such as UUID, INET or
+# tsvector are ordered arbitrarily or not at all
+ORDERABLE_TYPES = (
+    types.Integer,
+    types.Float,
+    types.Numeric,
+    types.String,
+    types.Date,
+    types.DateTime,
+    types.Time,
+)
+
+
+def _orderable(type_: Any) -> bool:
+    return isinstance(type_, ORDERABLE_TYPES)
+
+
+def profile_select(
+    from_: FromClause, columns: list[dict[str, Any]], exact_distinct: set[str]
+) -> Select:
+    """
+    Returns one aggregate select of the row count and, for every column, its
+    null count, min and max, average length and, for the columns given,
+    exact distinct count.
+    """
+    aggregates = [func.count().label("row_count")]
+
+    for index, column in enumerate(columns):
+        name, type_ = column["name"], column["type"]
+        column_ = from_.c[name]
+        aggregates.append((func.count() - func.count(column_)).label(f"nulls_{index}"))
+
+        if name in exact_distinct and _comparable(type_):
+            aggregates.append(func.count(column_.distinct()).label(f"distinct_{index}"))
+        if _orderable(type_):
+            aggregates.append(func.min(column_).label(f"min_{index}"))
+            aggregates.append(func.max(column_).label(f"max_{index}"))
+        if isinstance(type_, types.String):
+            aggregates.append(
+                func.avg(func.char_length(column_)).label(f"avg_length_{index}")
+            )
+        elif isinstance(type_, types._Binary):
+            aggregates.append(
+                func.avg(func.octet_length(column_)).label(f"avg_length_{index}")
+            )
+
+    return select(*aggregates).select_from(from_)
+
+
+def read_profile(
+    columns: list[dict[str, Any]],
+    row: Any,
+    distinct_estimates: dict[str, float],
+    sampled: bool,
+) -> dict[str, Any]:
+    """
+    Returns the table profile of an aggregate row.
+    Negative distinct estimates are fractions of the row count, as in pg_stats.
+    """
+    values = row._mapping
+    row_count = values["row_count"]
+    profiles = []
+
+    for index, column in enumerate(columns):
+        name = column["name"]
+        null_count = values[f"nulls_{index}"]
+        distinct_count = values.get(f"distinct_{index}")
+        estimate = distinct_estimates.get(name)
+
+        if distinct_count is None and estimate is not None:
+            distinct_count = round(-estimate * row_count if estimate < 0 else estimate)
+
+        avg_length = values.get(f"avg_length_{index}")
+        profiles.append(
+            {
+                "name": name,
+                "type": str(column["type"]),
+                "null_count": null_count,
+                "null_fraction": null_count / row_count if row_count else None,
+                "distinct_count": distinct_count,
+                "distinct_estimated": f"distinct_{index}" not in values
+                and estimate is not None,
+                "min": values.get(f"min_{index}"),
+                "max": values.get(f"max_{index}"),
+                "avg_length": None if avg_length is None else float(avg_length),
+            }
+        )
+
+    return {"row_count": row_count, "sampled": sampled, "columns": profiles}
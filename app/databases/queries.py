@@ -0,0 +1,424 @@
+"""SQLAlchemy Core statements shared by the source databases."""
+
+import operator
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from math import ceil
+from random import Random
+from typing import Any, Callable, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    ColumnClause,
+    Connection,
+    Integer,
+    TableClause,
+    column,
+    func,
+    literal,
+    select,
+    table,
+    tablesample,
+    text,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.sql import CompoundSelect, Select
+
+# rows fetched per wanted sample row, as sampled row counts vary
+SAMPLE_OVERSAMPLING = 1.5
+SAMPLE_PROBES = 100
+# chunks a table is split into at most, larger chunks are made beyond
+MAX_CHUNKS = 1000
+
+# filter operators, given as column:operator:value
+FILTER_OPERATORS: dict[str, Callable[[ColumnClause, Any], Any]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "le": operator.le,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "like": lambda column_, value: column_.like(value),
+    "in": lambda column_, values: column_.in_(values),
+    "null": lambda column_, _: column_.is_(None),
+    "notnull": lambda column_, _: column_.is_not(None),
+}
+
+
+class Error(str, Enum):
+    NO_PRIMARY_KEY_ERROR = "Database table has no primary key."
+    INVALID_CURSOR_ERROR = "Cursor does not match the table primary key."
+    NO_SAMPLING_KEY_ERROR = "Sampling needs a single integer primary key."
+    UNKNOWN_WATERMARK_ERROR = "Watermark column does not exist in the table."
+    INVALID_WATERMARK_ERROR = "Watermark value does not match the column type."
+    UNKNOWN_TABLE_ERROR = "Database table does not exist."
+    UNKNOWN_COLUMN_ERROR = "Column does not exist in the table."
+    CURSOR_COLUMN_ERROR = "Columns must include the primary key and watermark columns."
+    INVALID_FILTER_ERROR = "Filter must be given as column:operator:value."
+    INVALID_FILTER_VALUE_ERROR = "Filter value does not match the column type."
+
+
+def table_clause(
+    name: str, schema: str | None, columns: list[dict[str, Any]]
+) -> TableClause:
+    """Returns a table construct of reflected columns."""
+    return table(
+        name,
+        *[column(column_["name"], column_["type"]) for column_ in columns],
+        schema=schema,
+    )
+
+
+def project(
+    columns: list[dict[str, Any]],
+    names: Sequence[str] | None,
+    cursor: Sequence[str] = (),
+) -> list[dict[str, Any]]:
+    """
+    Returns the reflected columns of the given names, or all if none given.
+    The given names must include the cursor columns, that clients resume from.
+    """
+    if not names:
+        return columns
+
+    columns_by_name = {column_["name"]: column_ for column_ in columns}
+
+    if any(name not in columns_by_name for name in names):
+        raise HTTPException(status_code=422, detail=Error.UNKNOWN_COLUMN_ERROR)
+
+    if any(name not in names for name in cursor):
+        raise HTTPException(status_code=422, detail=Error.CURSOR_COLUMN_ERROR)
+
+    return [columns_by_name[name] for name in names]
+
+
+def get_column(table_: TableClause, name: str) -> ColumnClause:
+    """Returns a column of a table."""
+    if name not in table_.c:
+        raise HTTPException(status_code=422, detail=Error.UNKNOWN_COLUMN_ERROR)
+
+    return table_.c[name]
+
+
+def filter_conditions(table_: TableClause, filters: Sequence[str] | None) -> list:
+    """
+    Returns the conditions of filters given as column:operator:value, their
+    values bound as parameters of the column types. The `in` operator takes
+    comma separated values, `null` and `notnull` take none.
+    """
+    conditions = []
+
+    for filter_ in filters or []:
+        name, _, condition = filter_.partition(":")
+        operator_, _, value = condition.partition(":")
+
+        if operator_ not in FILTER_OPERATORS:
+            raise HTTPException(status_code=422, detail=Error.INVALID_FILTER_ERROR)
+
+        column_ = get_column(table_, name)
+
+        try:
+            if operator_ == "in":
+                value = [coerce(item, column_.type) for item in value.split(",")]
+            elif operator_ not in ("like", "null", "notnull"):
+                value = coerce(value, column_.type)
+        except (ValueError, ArithmeticError):
+            raise HTTPException(
+                status_code=422, detail=Error.INVALID_FILTER_VALUE_ERROR
+            )
+
+        conditions.append(FILTER_OPERATORS[operator_](column_, value))
+
+    return conditions
+
+
+def filter_select(
+    statement: Select, table_: TableClause, filters: Sequence[str] | None
+) -> Select:
+    """Returns the select restricted by filters given as column:operator:value."""
+    return statement.where(*filter_conditions(table_, filters))
+
+
+def order_select(
+    statement: Select, table_: TableClause, order: Sequence[str] | None
+) -> Select:
+    """Returns the select ordered by columns, descending if prefixed with `-`."""
+    for name in order or []:
+        if name.startswith("-"):
+            statement = statement.order_by(get_column(table_, name[1:]).desc())
+        else:
+            statement = statement.order_by(get_column(table_, name))
+
+    return statement
+
+
+def coerce(value: str, type_: Any) -> Any:
+    """Converts a query string value to the python type of a column."""
+    try:
+        python_type = type_.python_type
+    except NotImplementedError:
+        return value
+
+    if python_type is bool:
+        if value.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(value)
+
+        return value.lower() in ("true", "1")
+    if python_type in (int, float, Decimal):
+        return python_type(value)
+    if python_type in (date, datetime, time):
+        return python_type.fromisoformat(value)
+
+    return value
+
+
+def keyset_select(
+    table_: TableClause,
+    primary_key: list[str],
+    after: Sequence[str] | None = None,
+    limit: int | None = None,
+) -> Select:
+    """
+    Returns a select of table rows ordered by primary key.
+    Rows start after the given primary key values when a cursor is given.
+    """
+    statement = select(table_)
+
+    if after and not primary_key:
+        raise HTTPException(status_code=422, detail=Error.NO_PRIMARY_KEY_ERROR)
+
+    if primary_key:
+        key_columns = [table_.c[name] for name in primary_key]
+        statement = statement.order_by(*key_columns)
+
+        if after:
+            if len(after) != len(key_columns):
+                raise HTTPException(status_code=422, detail=Error.INVALID_CURSOR_ERROR)
+
+            try:
+                values = [
+                    coerce(value, key_column.type)
+                    for value, key_column in zip(after, key_columns)
+                ]
+            except (ValueError, ArithmeticError):
+                raise HTTPException(status_code=422, detail=Error.INVALID_CURSOR_ERROR)
+
+            statement = statement.where(tuple_(*key_columns) > tuple_(*values))
+
+    if limit is not None:
+        statement = statement.limit(limit)
+
+    return statement
+
+
+def integer_key(table_: TableClause, primary_key: list[str]) -> ColumnClause | None:
+    """Returns the primary key column if it is a single integer column."""
+    if len(primary_key) != 1 or not isinstance(table_.c[primary_key[0]].type, Integer):
+        return None
+
+    return table_.c[primary_key[0]]
+
+
+def get_watermark_column(table_: TableClause, watermark: str) -> ColumnClause:
+    """Returns the watermark column of a table."""
+    if watermark not in table_.c:
+        raise HTTPException(status_code=422, detail=Error.UNKNOWN_WATERMARK_ERROR)
+
+    return table_.c[watermark]
+
+
+def watermark_select(
+    table_: TableClause,
+    watermark: str,
+    primary_key: list[str],
+    since: str | None = None,
+    until: Any = None,
+    limit: int | None = None,
+    after: Sequence[str] | None = None,
+    where: Sequence[Any] = (),
+) -> Select:
+    """
+    Returns a select of table rows whose watermark column is after since and
+    up to until, ordered by watermark then primary key.
+    Given the primary key values of the last row read as after, rows start
+    after that row, so that rows sharing its watermark value aren't skipped.
+    Without a primary key, limited pages end with every row of their last
+    watermark value, and may have more rows than the limit.
+    Further conditions restrict the rows before pages are cut.
+    """
+    watermark_column = get_watermark_column(table_, watermark)
+    key_columns = [table_.c[name] for name in primary_key]
+    conditions = list(where)
+
+    if after and (since is None or len(after) != len(key_columns)):
+        raise HTTPException(status_code=422, detail=Error.INVALID_CURSOR_ERROR)
+
+    if since is not None:
+        try:
+            value = coerce(since, watermark_column.type)
+        except (ValueError, ArithmeticError):
+            raise HTTPException(status_code=422, detail=Error.INVALID_WATERMARK_ERROR)
+
+        if after:
+            try:
+                values = [
+                    coerce(key_value, key_column.type)
+                    for key_value, key_column in zip(after, key_columns)
+                ]
+            except (ValueError, ArithmeticError):
+                raise HTTPException(status_code=422, detail=Error.INVALID_CURSOR_ERROR)
+
+            conditions.append(
+                tuple_(watermark_column, *key_columns) > tuple_(value, *values)
+            )
+        else:
+            conditions.append(watermark_column > value)
+
+    if until is not None:
+        conditions.append(watermark_column <= until)
+
+    statement = (
+        select(table_).where(*conditions).order_by(watermark_column, *key_columns)
+    )
+
+    if limit is not None and key_columns:
+        statement = statement.limit(limit)
+    elif limit is not None:
+        page = (
+            select(watermark_column)
+            .where(*conditions)
+            .order_by(watermark_column)
+            .limit(limit)
+            .subquery()
+        )
+        statement = statement.where(
+            watermark_column <= select(func.max(page.c[watermark])).scalar_subquery()
+        )
+
+    return statement
+
+
+def key_range_chunks(
+    session: Connection,
+    table_: TableClause,
+    primary_key: list[str],
+    chunk_size: int,
+    ranked: bool = True,
+) -> list[Select] | None:
+    """
+    Returns selects of consecutive primary key ranges of chunk_size rows, at
+    most MAX_CHUNKS of them, or None if the primary key is not a single
+    integer column. Ranked range boundaries are the keys of every
+    chunk_size-th row, so sparse keys make no empty ranges. Otherwise, for
+    servers without window functions, ranges span chunk_size key values.
+    The first and last ranges are left open to include rows inserted meanwhile.
+    """
+    key_column = integer_key(table_, primary_key)
+
+    if key_column is None:
+        return None
+
+    if ranked:
+        row_count = session.execute(select(func.count(key_column))).scalar()
+        step = max(chunk_size, ceil(row_count / MAX_CHUNKS))
+        numbered = select(
+            key_column.label("key"),
+            func.row_number().over(order_by=key_column).label("number"),
+        ).subquery()
+        boundaries = (
+            session.execute(
+                select(numbered.c.key)
+                .where((numbered.c.number - 1) % step == 0)
+                .order_by(numbered.c.key)
+            )
+            .scalars()
+            .all()
+        )
+    else:
+        low, high = session.execute(
+            select(func.min(key_column), func.max(key_column))
+        ).one()
+        boundaries = []
+
+        if low is not None:
+            step = max(chunk_size, ceil((high - low + 1) / MAX_CHUNKS))
+            boundaries = list(range(low, high + 1, step))
+
+    chunks = []
+    for index, boundary in enumerate(boundaries or [None]):
+        statement = select(table_).order_by(key_column)
+        if index > 0:
+            statement = statement.where(key_column >= boundary)
+        if index + 1 < len(boundaries):
+            statement = statement.where(key_column < boundaries[index + 1])
+        chunks.append(statement)
+
+    return chunks
+
+
+def block_range_chunks(
+    table_: TableClause, pages: int, pages_per_chunk: int
+) -> list[Select]:
+    """
+    Returns selects of consecutive PostgreSQL heap block ranges, by ctid, at
+    most MAX_CHUNKS of them.
+    The last range is left open to include rows inserted meanwhile.
+    """
+    pages_per_chunk = max(pages_per_chunk, ceil(pages / MAX_CHUNKS), 1)
+    chunks = []
+    for start in range(0, max(pages, 1), pages_per_chunk):
+        statement = select(table_).where(
+            text("ctid >= CAST(:start AS tid)").bindparams(start=f"({start},0)")
+        )
+        if start + pages_per_chunk < pages:
+            statement = statement.where(
+                text("ctid < CAST(:end AS tid)").bindparams(
+                    end=f"({start + pages_per_chunk},0)"
+                )
+            )
+        chunks.append(statement)
+
+    return chunks
+
+
+def tablesample_select(
+    table_: TableClause, method: str, percent: float, seed: int, limit: int
+) -> Select:
+    """
+    Returns a select of a PostgreSQL TABLESAMPLE of about percent of the rows,
+    the same rows for the same seed while the table is unchanged.
+    """
+    sample = tablesample(
+        table_, getattr(func, method)(percent), name="sample", seed=literal(seed)
+    )
+    return select(sample).limit(limit)
+
+
+def key_probe_select(
+    table_: TableClause,
+    key_column: ColumnClause,
+    low: int,
+    high: int,
+    size: int,
+    seed: int,
+) -> CompoundSelect:
+    """
+    Returns a union of short primary key runs starting at random keys between
+    low and high, the same keys for the same seed.
+    Each run is an index range scan, so its cost does not grow with the table.
+    """
+    random = Random(seed)
+    probes = min(size, SAMPLE_PROBES)
+    rows_per_probe = ceil(size * SAMPLE_OVERSAMPLING / probes)
+
+    return union_all(
+        *[
+            select(table_)
+            .where(key_column >= random.randint(low, high))
+            .order_by(key_column)
+            .limit(rows_per_probe)
+            for _ in range(probes)
+        ]
+    )
@@ -1,14 +1,86 @@
-"""Main database. Not included in database factory"""
+"""
+Main database. Not included in database factory.
 
+SQLite by default, tuned for concurrent readers and writers, or any server
+database given by DATABASE_URL. The async engine serves async routes, so
+that app database lookups don't block the event loop.
+"""
+
+from sqlalchemy import Engine, event, inspect, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import SQLModel, create_engine
 
-sqlite_file_name = "app.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+from app import config
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+
+def async_url(url: str) -> str:
+    """Returns the URL of a database with its async driver."""
+    url_ = make_url(url)
+    backend = url_.get_backend_name()
+    return url_.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+def tune_sqlite(engine: Engine) -> None:
+    """
+    Sets the pragmas of new SQLite connections: write-ahead logging so readers
+    never wait for writers, a busy timeout so writers wait for the lock instead
+    of failing, and larger page cache and memory mapping.
+    """
+
+    @event.listens_for(engine, "connect")
+    def receive_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT}")
+        cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        cursor.close()
+
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args)
+def create_engines(url: str) -> tuple[Engine, AsyncEngine]:
+    """Returns the sync and async engines of the app database."""
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+        async_engine = create_async_engine(async_url(url))
 
+        tune_sqlite(engine)
+        tune_sqlite(async_engine.sync_engine)
+    else:
+        options = {"pool_size": config.DATABASE_POOL_SIZE, "pool_pre_ping": True}
+        engine = create_engine(url, **options)
+        async_engine = create_async_engine(async_url(url), **options)
 
-# Create database tables
+    return engine, async_engine
+
+
+engine, async_engine = create_engines(config.DATABASE_URL)
+
+
+# Create database tables, and nullable columns and indexes added to existing
+# tables, other schema changes need a migration
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            names = {column["name"] for column in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name not in names and column.nullable:
+                    definition = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(
+                        f"ALTER TABLE {preparer.format_table(table)} "
+                        f"ADD COLUMN {definition}"
+                    )
+
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
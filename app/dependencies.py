@@ -2,8 +2,9 @@ from typing import Annotated
 
 from fastapi import Depends
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.databases.sqlite import engine
+from app.databases.sqlite import async_engine, engine
 
 
 def get_session():
@@ -11,4 +12,11 @@ def get_session():
         yield session
 
 
+async def get_async_session():
+    # loaded objects stay readable after commit without lazy loading
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 SessionDep = Annotated[Session, Depends(get_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
@@ -0,0 +1,83 @@
+"""Parallel extraction of source table rows in chunks."""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Iterator, Sequence
+
+from app.databases import Database
+
+
+class ParallelExtractor:
+    """
+    Reads the chunks of a table concurrently, one pooled connection per chunk
+    in flight, and yields each chunk's rows as a batch.
+    Ordered extraction yields chunks in table order, unordered extraction
+    yields them as soon as they are read.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        parallelism: int,
+        chunk_size: int,
+        ordered: bool = True,
+    ) -> None:
+        self.__database = database
+        self.__parallelism = parallelism
+        self.__chunk_size = chunk_size
+        self.__ordered = ordered
+
+    def extract(self) -> Iterator[Sequence[Any]]:
+        chunks = iter(self.__database.get_table_chunks(self.__chunk_size))
+        executor = ThreadPoolExecutor(self.__parallelism)
+
+        try:
+            if self.__ordered:
+                yield from self.__extract_ordered(executor, chunks)
+            else:
+                yield from self.__extract_unordered(executor, chunks)
+        finally:
+            # stops reading chunks when the client goes away
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def __submit(self, executor: ThreadPoolExecutor, chunks: Iterator) -> Future | None:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return None
+        return executor.submit(self.__database.get_chunk_rows, chunk)
+
+    def __extract_ordered(
+        self, executor: ThreadPoolExecutor, chunks: Iterator
+    ) -> Iterator[Sequence[Any]]:
+        in_flight: deque[Future] = deque()
+
+        while True:
+            while len(in_flight) < self.__parallelism:
+                future = self.__submit(executor, chunks)
+                if future is None:
+                    break
+                in_flight.append(future)
+
+            if not in_flight:
+                return
+
+            yield in_flight.popleft().result()
+
+    def __extract_unordered(
+        self, executor: ThreadPoolExecutor, chunks: Iterator
+    ) -> Iterator[Sequence[Any]]:
+        in_flight: set[Future] = set()
+
+        while True:
+            while len(in_flight) < self.__parallelism:
+                future = self.__submit(executor, chunks)
+                if future is None:
+                    break
+                in_flight.add(future)
+
+            if not in_flight:
+                return
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,370 @@
+"""
+Background jobs, queued in the app database.
+
+Jobs are claimed by worker threads of the app process, and by any worker
+process started with `python -m app.worker` on the same database. Running
+jobs hold a lease renewed by a heartbeat, and jobs whose lease expired, as
+their worker died, are claimed again.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from threading import Event, Thread
+from time import monotonic
+from typing import Any, BinaryIO, Callable, Iterator, Sequence
+from uuid import uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import Engine, and_, func, or_, update
+from sqlmodel import Session, select
+
+from app import config
+from app.databases import DatabaseFactory
+from app.exporters import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE, ArrowExporter
+from app.models.job import Job, JobStatus
+from app.models.source_connection import SourceConnection
+from app.serializers import to_json_lines, to_ndjson
+from app.testers import SourceConnectionBatchTester
+
+EXTRACT_FORMATS = ("ndjson", "arrow", "parquet")
+RESULT_MEDIA_TYPES = {
+    ".ndjson": "application/x-ndjson",
+    ".json": "application/json",
+    ".arrow": ARROW_MEDIA_TYPE,
+    ".parquet": PARQUET_MEDIA_TYPE,
+}
+
+
+class JobCancelled(Exception):
+    """Raised in a running job once its cancellation was requested."""
+
+
+class JobInterrupted(Exception):
+    """Raised in a running job once its worker is shutting down."""
+
+
+class JobContext:
+    """
+    Reports the progress of a running job, at most once per interval, and
+    raises JobCancelled when reporting finds its cancellation requested,
+    or JobInterrupted once the interrupt event is set.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        job_id: int,
+        interval: float,
+        interrupt: Event | None = None,
+    ) -> None:
+        self.engine = engine
+        self.__job_id = job_id
+        self.__interval = interval
+        self.__interrupt = interrupt
+        self.__progress = 0
+        self.__reported_at = monotonic()
+
+    def advance(self, count: int = 1) -> None:
+        if self.__interrupt and self.__interrupt.is_set():
+            raise JobInterrupted()
+
+        self.__progress += count
+
+        if monotonic() - self.__reported_at >= self.__interval:
+            self.report()
+
+    def report(self) -> None:
+        self.__reported_at = monotonic()
+
+        with Session(self.engine) as session:
+            job = session.get(Job, self.__job_id)
+            job.progress = self.__progress
+            session.add(job)
+            session.commit()
+
+            if job.cancel_requested:
+                raise JobCancelled()
+
+    def count(self, batches: Iterator[Sequence[Any]]) -> Iterator[Sequence[Any]]:
+        """Yields the batches, advancing by the rows of each."""
+        for batch in batches:
+            yield batch
+            self.advance(len(batch))
+
+
+def _source_connection(context: JobContext, job: Job) -> dict[str, Any]:
+    with Session(context.engine) as session:
+        source_connection = session.get(SourceConnection, job.source_connection_id)
+
+    if not source_connection:
+        raise ValueError("Source connection not found.")
+
+    return source_connection.model_dump()
+
+
+def run_extraction(job: Job, context: JobContext, file: BinaryIO) -> None:
+    """Writes table rows as NDJSON, an Arrow IPC stream or a Parquet file."""
+    database = DatabaseFactory(_source_connection(context, job)).get_database()
+    format = job.parameters.get("format", "ndjson")
+    batches = context.count(
+        database.stream_table_rows(
+            limit=job.parameters.get("limit"),
+            batch_size=job.parameters.get("batch_size", 10000),
+        )
+    )
+
+    if format == "ndjson":
+        chunks = (chunk.encode() for chunk in to_ndjson(batches))
+    else:
+        arrow_exporter = ArrowExporter(database.get_table_columns())
+        chunks = (
+            arrow_exporter.to_parquet(batches)
+            if format == "parquet"
+            else arrow_exporter.to_arrow_stream(batches)
+        )
+
+    for chunk in chunks:
+        file.write(chunk)
+
+
+def run_catalog_import(job: Job, context: JobContext, file: BinaryIO) -> None:
+    """Writes the catalog of the source connection schema as JSON."""
+    database = DatabaseFactory(_source_connection(context, job)).get_database()
+    catalog = database.get_catalog()
+    context.advance(len(catalog))
+    file.write(json.dumps(catalog, default=str).encode())
+
+
+def run_batch_test(job: Job, context: JobContext, file: BinaryIO) -> None:
+    """Writes one NDJSON result per tested source connection."""
+    statement = select(SourceConnection)
+
+    if not job.parameters.get("all"):
+        statement = statement.where(
+            SourceConnection.id.in_(job.parameters.get("ids", []))
+        )
+
+    with Session(context.engine) as session:
+        source_connection_dicts = [
+            source_connection.model_dump()
+            for source_connection in session.exec(statement).all()
+        ]
+
+    source_connection_batch_tester = SourceConnectionBatchTester(
+        source_connection_dicts,
+        workers=config.TEST_BATCH_WORKERS,
+        timeout=config.TEST_BATCH_TIMEOUT,
+    )
+
+    for line in to_json_lines(source_connection_batch_tester.test()):
+        file.write(line.encode())
+        context.advance()
+
+
+JOB_HANDLERS: dict[str, Callable[[Job, JobContext, BinaryIO], None]] = {
+    "extract": run_extraction,
+    "catalog": run_catalog_import,
+    "test-batch": run_batch_test,
+}
+
+
+def result_suffix(job: Job) -> str:
+    """Returns the file suffix of a job's result."""
+    if job.kind == "extract":
+        return "." + job.parameters.get("format", "ndjson")
+
+    return ".json" if job.kind == "catalog" else ".ndjson"
+
+
+class JobWorker:
+    """
+    Claims queued jobs one at a time and runs them, writing their result file.
+    Jobs are claimed with a conditional update, so that many workers, in
+    threads or processes, never run the same job. The lease of a running job
+    is renewed every third of the lease timeout, and running jobs whose lease
+    expired are claimed as queued ones. Workers only update jobs whose lease
+    they still hold.
+    Jobs interrupted by a shutdown are queued again.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        results_dir: str = config.JOB_RESULTS_DIR,
+        progress_interval: float = config.JOB_PROGRESS_INTERVAL,
+        lease_timeout: float = config.JOB_LEASE_TIMEOUT,
+        interrupt: Event | None = None,
+    ) -> None:
+        self.__engine = engine
+        self.__results_dir = Path(results_dir)
+        self.__progress_interval = progress_interval
+        self.__lease_timeout = lease_timeout
+        self.__interrupt = interrupt
+
+    def __claimable(self):
+        expired = datetime.now(timezone.utc) - timedelta(seconds=self.__lease_timeout)
+        return or_(
+            Job.status == JobStatus.QUEUED,
+            and_(
+                Job.status == JobStatus.RUNNING,
+                func.coalesce(Job.heartbeat_at, Job.started_at) < expired,
+            ),
+        )
+
+    def __claim(self) -> Job | None:
+        with Session(self.__engine) as session:
+            while True:
+                job = session.exec(
+                    select(Job).where(self.__claimable()).order_by(Job.id)
+                ).first()
+
+                if not job:
+                    return None
+
+                now = datetime.now(timezone.utc)
+                claimed = session.exec(
+                    update(Job)
+                    .where(Job.id == job.id, self.__claimable())
+                    .values(
+                        status=JobStatus.RUNNING,
+                        started_at=now,
+                        heartbeat_at=now,
+                        lease_id=uuid4().hex,
+                    )
+                )
+                session.commit()
+
+                if claimed.rowcount == 1:
+                    session.refresh(job)
+                    return job
+
+    def __update_leased(self, job: Job, **values: Any) -> None:
+        """Updates a job if still running under the lease of its claim."""
+        with Session(self.__engine) as session:
+            session.exec(
+                update(Job)
+                .where(
+                    Job.id == job.id,
+                    Job.status == JobStatus.RUNNING,
+                    Job.lease_id == job.lease_id,
+                )
+                .values(**values)
+            )
+            session.commit()
+
+    def __heartbeat(self, job: Job, done: Event) -> None:
+        while not done.wait(self.__lease_timeout / 3):
+            self.__update_leased(job, heartbeat_at=datetime.now(timezone.utc))
+
+    def __requeue(self, job: Job) -> None:
+        self.__update_leased(
+            job,
+            status=JobStatus.QUEUED,
+            progress=0,
+            started_at=None,
+            heartbeat_at=None,
+            lease_id=None,
+        )
+
+    def __finish(self, job: Job, status: JobStatus, **values: Any) -> None:
+        self.__update_leased(
+            job, status=status, finished_at=datetime.now(timezone.utc), **values
+        )
+
+    def run_once(self) -> bool:
+        """Runs the oldest queued job, if any. Returns whether one was run."""
+        job = self.__claim()
+
+        if not job:
+            return False
+
+        handler = JOB_HANDLERS[job.kind]
+        context = JobContext(
+            self.__engine, job.id, self.__progress_interval, self.__interrupt
+        )
+        self.__results_dir.mkdir(parents=True, exist_ok=True)
+        path = self.__results_dir / f"{job.id}{result_suffix(job)}"
+        partial_path = path.with_name(path.name + ".part")
+
+        done = Event()
+        Thread(
+            target=self.__heartbeat,
+            args=(job, done),
+            name=f"job-heartbeat-{job.id}",
+            daemon=True,
+        ).start()
+
+        try:
+            with open(partial_path, "wb") as file:
+                handler(job, context, file)
+            context.report()
+        except JobInterrupted:
+            partial_path.unlink(missing_ok=True)
+            self.__requeue(job)
+        except JobCancelled:
+            partial_path.unlink(missing_ok=True)
+            self.__finish(job, JobStatus.CANCELLED)
+        except Exception as error:
+            partial_path.unlink(missing_ok=True)
+            detail = error.detail if isinstance(error, HTTPException) else error
+            self.__finish(
+                job, JobStatus.FAILED, error=getattr(detail, "value", str(detail))
+            )
+        else:
+            os.replace(partial_path, path)
+            self.__finish(job, JobStatus.SUCCEEDED, result_path=str(path))
+        finally:
+            done.set()
+
+        return True
+
+    def run(self, stop: Event, poll_interval: float = config.JOB_POLL_INTERVAL):
+        """Runs queued jobs until stopped, polling the queue when it is empty."""
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(poll_interval)
+
+
+class JobWorkerPool:
+    """Runs job workers in background threads."""
+
+    def __init__(self, engine: Engine, size: int) -> None:
+        self.__engine = engine
+        self.__size = size
+        self.__stop = Event()
+        self.__interrupt = Event()
+        self.__threads: list[Thread] = []
+
+    def start(self) -> None:
+        for index in range(self.__size):
+            thread = Thread(
+                target=JobWorker(self.__engine, interrupt=self.__interrupt).run,
+                args=(self.__stop,),
+                name=f"job-worker-{index}",
+                daemon=True,
+            )
+            thread.start()
+            self.__threads.append(thread)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stops the workers once their running job is done, waiting up to the
+        timeout for it. Jobs still running then are interrupted and queued
+        again, or claimed again once their lease expires if they don't
+        respond in time.
+        """
+        self.__stop.set()
+        deadline = None if timeout is None else monotonic() + timeout
+
+        for thread in self.__threads:
+            thread.join(None if deadline is None else max(deadline - monotonic(), 0))
+
+        if any(thread.is_alive() for thread in self.__threads):
+            self.__interrupt.set()
+
+            for thread in self.__threads:
+                thread.join(config.JOB_POLL_INTERVAL)
+
+        self.__threads.clear()
@@ -1,17 +1,51 @@
 from contextlib import asynccontextmanager
+from time import perf_counter
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from prometheus_client import REGISTRY
 
-from app.databases.sqlite import create_db_and_tables
-from app.routers import source_connections
+from app import config
+from app.breakers import CircuitOpenError
+from app.databases.engines import engine_registry
+from app.databases.sqlite import create_db_and_tables, engine
+from app.jobs import JobWorkerPool
+from app.metrics import REQUEST_DURATION, PoolCollector
+from app.routers import jobs, metrics, source_connections
 
 
-# Create database tables on startup
+# Create database tables and start job workers on startup,
+# stop job workers and dispose source engines on shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    job_workers = JobWorkerPool(engine, config.JOB_WORKERS)
+    job_workers.start()
     yield
+    job_workers.stop(timeout=config.JOB_SHUTDOWN_TIMEOUT)
+    engine_registry.dispose_all()
 
 
 app = FastAPI(title="Schema Importer", lifespan=lifespan)
 app.include_router(source_connections.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
+
+REGISTRY.register(PoolCollector(engine_registry.engines))
+
+
+@app.middleware("http")
+async def observe_request_duration(request: Request, call_next):
+    started = perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    REQUEST_DURATION.labels(
+        request.method, route.path if route else "unmatched", response.status_code
+    ).observe(perf_counter() - started)
+
+    return response
+
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_exception_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
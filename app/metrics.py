@@ -0,0 +1,141 @@
+"""Prometheus metrics of requests and of the stages of source database access."""
+
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.metrics_core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy import Engine, event
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response starts, per route.",
+    ["method", "route", "status"],
+)
+STAGE_DURATION = Histogram(
+    "source_stage_duration_seconds",
+    "Time spent in a stage of source database access: get_database, connect, "
+    "checkout, reflection or fetch.",
+    ["stage", "source_type"],
+)
+TEST_CHECK_DURATION = Histogram(
+    "source_test_check_duration_seconds",
+    "Time spent in a source connection test check.",
+    ["check", "source_type"],
+)
+SERIALIZATION_DURATION = Histogram(
+    "serialization_duration_seconds",
+    "Time spent encoding rows, per format.",
+    ["format"],
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups, per cache and result (hit or miss).",
+    ["cache", "result"],
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, *labels: str) -> Iterator[None]:
+    """Observes the time spent in the block."""
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(perf_counter() - started)
+
+
+def timed_iterator(
+    iterator: Iterable[Any], histogram: Histogram, *labels: str
+) -> Iterator[Any]:
+    """Yields the items, observing the time spent producing each."""
+    iterator = iter(iterator)
+
+    while True:
+        with timed(histogram, *labels):
+            item = next(iterator, StopIteration)
+
+        if item is StopIteration:
+            return
+
+        yield item
+
+
+class TimedInspector:
+    """Inspector wrapper observing the time spent in each reflection call."""
+
+    def __init__(self, inspector: Any, source_type: str) -> None:
+        self.__inspector = inspector
+        self.__source_type = source_type
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.__inspector, name)
+
+        if not callable(attribute):
+            return attribute
+
+        def timed_call(*args, **kwargs):
+            with timed(STAGE_DURATION, "reflection", self.__source_type):
+                return attribute(*args, **kwargs)
+
+        return timed_call
+
+
+def instrument(engine: Engine) -> None:
+    """Observes the time an engine spends opening new database connections."""
+    source_type = engine.dialect.name
+
+    @event.listens_for(engine, "do_connect")
+    def receive_do_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_started"] = perf_counter()
+
+    @event.listens_for(engine, "connect")
+    def receive_connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_started", None)
+
+        if started is not None:
+            STAGE_DURATION.labels("connect", source_type).observe(
+                perf_counter() - started
+            )
+
+
+class PoolCollector(Collector):
+    """Collects the connection pool gauges of pooled source database engines."""
+
+    def __init__(self, engines: Callable[[], list[tuple[int, Engine]]]) -> None:
+        self.__engines = engines
+
+    def collect(self):
+        labels = ["source_connection_id", "source_type"]
+        gauges = {
+            "size": GaugeMetricFamily(
+                "source_pool_size", "Connections kept by the pool.", labels=labels
+            ),
+            "checkedout": GaugeMetricFamily(
+                "source_pool_checked_out",
+                "Connections checked out of the pool.",
+                labels=labels,
+            ),
+            "checkedin": GaugeMetricFamily(
+                "source_pool_checked_in",
+                "Idle connections in the pool.",
+                labels=labels,
+            ),
+            "overflow": GaugeMetricFamily(
+                "source_pool_overflow",
+                "Connections opened beyond the pool size, negative while the "
+                "pool is not full.",
+                labels=labels,
+            ),
+        }
+
+        for id, engine in self.__engines():
+            for method, gauge in gauges.items():
+                value = getattr(engine.pool, method, None)
+
+                if value is not None:
+                    gauge.add_metric([str(id), engine.dialect.name], value())
+
+        yield from gauges.values()
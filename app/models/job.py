@@ -0,0 +1,60 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Literal
+
+from sqlmodel import JSON, Column, Field, SQLModel
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobBase(SQLModel):
+    """Base data model of background job."""
+
+    kind: str  # extract, catalog or test-batch
+    source_connection_id: int | None = None  # not for test-batch
+    parameters: dict[str, Any] = Field(default={}, sa_column=Column(JSON))
+
+
+class JobCreate(JobBase):
+    """
+    Data model for creating background job.
+    Extractions take 'format' (ndjson, arrow or parquet), 'limit' and
+    'batch_size' parameters, batch tests take 'ids' or 'all'.
+    """
+
+    kind: Literal["extract", "catalog", "test-batch"]
+
+
+class Job(JobBase, table=True):
+    """Table model of background job, which is also its queue entry."""
+
+    id: int | None = Field(default=None, primary_key=True)
+    status: JobStatus = Field(default=JobStatus.QUEUED, index=True)
+    progress: int = 0  # rows extracted or connections tested
+    cancel_requested: bool = False
+    error: str | None = None
+    result_path: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    heartbeat_at: datetime | None = None  # renewed while running
+    lease_id: str | None = None  # of the worker running the job
+    finished_at: datetime | None = None
+
+
+class JobPublic(JobBase):
+    """Public data model of background job."""
+
+    id: int
+    status: JobStatus
+    progress: int
+    cancel_requested: bool
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
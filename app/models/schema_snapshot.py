@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Any
+
+from sqlmodel import JSON, Column, Field, SQLModel
+
+
+class SchemaSnapshot(SQLModel, table=True):
+    """
+    Table model of the reflected columns of a source connection table,
+    saved with their fingerprint each time the schema is seen changed.
+    """
+
+    id: int | None = Field(default=None, primary_key=True)
+    source_connection_id: int = Field(foreign_key="sourceconnection.id", index=True)
+    table_name: str
+    fingerprint: str
+    columns: list[dict[str, Any]] = Field(sa_column=Column(JSON))
+    created_at: datetime
@@ -1,6 +1,6 @@
 from typing import Literal
 
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Index, SQLModel
 
 
 class SourceConnectionBase(SQLModel):
@@ -16,6 +16,10 @@ class SourceConnectionBase(SQLModel):
     port: int
     db: str
 
+    # timeouts in seconds, 0 for none, global defaults apply if not set
+    connect_timeout: int | None = Field(default=None, ge=0)
+    statement_timeout: int | None = Field(default=None, ge=0)
+
 
 class SourceConnectionCreate(SourceConnectionBase):
     """
@@ -29,6 +33,13 @@ class SourceConnectionCreate(SourceConnectionBase):
 class SourceConnection(SourceConnectionBase, table=True):
     """Table model of source connection."""
 
+    # filtered listings, paginated by id
+    __table_args__ = (
+        Index("ix_sourceconnection_type_id", "type", "id"),
+        Index("ix_sourceconnection_host_id", "host", "id"),
+        Index("ix_sourceconnection_db_id", "db", "id"),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
     type: str  # mysql or postgresql
 
@@ -56,6 +67,25 @@ class SourceConnectionUpdate(SQLModel):
     port: int | None = None
     db: str | None = None
 
+    connect_timeout: int | None = Field(default=None, ge=0)
+    statement_timeout: int | None = Field(default=None, ge=0)
+
+
+class SourceConnectionBulkUpdate(SourceConnectionUpdate):
+    """Data model for updating one of many source connections at once."""
+
+    id: int
+
+
+class SourceConnectionTestBatch(SQLModel):
+    """
+    Data model for testing many saved source connections at once.
+    Tests every saved source connection if 'all' is set.
+    """
+
+    ids: list[int] = []
+    all: bool = False
+
 
 class SourceConnectionPublic(SQLModel):
     """
@@ -72,3 +102,6 @@ class SourceConnectionPublic(SQLModel):
     host: str
     port: int
     db: str
+
+    connect_timeout: int | None = None
+    statement_timeout: int | None = None
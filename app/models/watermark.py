@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel, UniqueConstraint
+
+
+class Watermark(SQLModel, table=True):
+    """
+    Table model of the last extracted value of a watermark column,
+    per source connection and table.
+    """
+
+    __table_args__ = (UniqueConstraint("source_connection_id", "table_name", "column"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    source_connection_id: int = Field(foreign_key="sourceconnection.id", index=True)
+    table_name: str
+    column: str
+    value: str
+    updated_at: datetime
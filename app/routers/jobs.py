@@ -0,0 +1,135 @@
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy import update
+from sqlmodel import select
+
+from app.dependencies import SessionDep
+from app.jobs import EXTRACT_FORMATS, RESULT_MEDIA_TYPES
+from app.models.job import Job, JobCreate, JobPublic, JobStatus
+from app.models.source_connection import SourceConnection
+
+
+class Error(str, Enum):
+    NOT_FOUND_ERROR = "Job not found."
+    SOURCE_CONNECTION_NOT_FOUND_ERROR = "Source connection not found."
+    INVALID_FORMAT_ERROR = "Extraction format must be ndjson, arrow or parquet."
+    NOT_CANCELLABLE_ERROR = "Job is already finished."
+    NO_RESULT_ERROR = "Job has no result yet."
+
+
+router = APIRouter(prefix="/jobs", tags=["Job"])
+
+
+@router.post("/")
+def create_job(job: JobCreate, session: SessionDep) -> JobPublic:
+    """
+    Queues a background job, run by the next free job worker.
+    Extraction and catalog jobs run on a saved source connection.
+    """
+
+    if job.kind != "test-batch" and not session.get(
+        SourceConnection, job.source_connection_id
+    ):
+        raise HTTPException(
+            status_code=422, detail=Error.SOURCE_CONNECTION_NOT_FOUND_ERROR
+        )
+
+    if (
+        job.kind == "extract"
+        and job.parameters.get("format", "ndjson") not in EXTRACT_FORMATS
+    ):
+        raise HTTPException(status_code=422, detail=Error.INVALID_FORMAT_ERROR)
+
+    new_job = Job.model_validate(job, update={"created_at": datetime.now(timezone.utc)})
+
+    session.add(new_job)
+    session.commit()
+    session.refresh(new_job)
+
+    return JobPublic(**new_job.model_dump())
+
+
+@router.get("/")
+def read_jobs(session: SessionDep, status: JobStatus | None = None) -> list[JobPublic]:
+    """Returns background jobs, latest first."""
+
+    statement = select(Job).order_by(Job.id.desc())
+
+    if status:
+        statement = statement.where(Job.status == status)
+
+    return [JobPublic(**job.model_dump()) for job in session.exec(statement).all()]
+
+
+@router.get("/{id}")
+def read_job(id: int, session: SessionDep) -> JobPublic:
+    """Returns the status and progress of a background job."""
+
+    job = session.get(Job, id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail=Error.NOT_FOUND_ERROR)
+
+    return JobPublic(**job.model_dump())
+
+
+@router.post("/{id}/cancel")
+def cancel_job(id: int, session: SessionDep) -> JobPublic:
+    """
+    Cancels a background job. Queued jobs are cancelled at once, running jobs
+    stop when they next report progress. Jobs are updated conditionally on
+    their status, as a worker may claim or finish them meanwhile.
+    """
+
+    job = session.get(Job, id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail=Error.NOT_FOUND_ERROR)
+
+    cancelled = session.exec(
+        update(Job)
+        .where(Job.id == id, Job.status == JobStatus.QUEUED)
+        .values(
+            status=JobStatus.CANCELLED,
+            cancel_requested=True,
+            finished_at=datetime.now(timezone.utc),
+        )
+    )
+
+    if cancelled.rowcount == 0:
+        cancelled = session.exec(
+            update(Job)
+            .where(Job.id == id, Job.status == JobStatus.RUNNING)
+            .values(cancel_requested=True)
+        )
+
+    if cancelled.rowcount == 0:
+        raise HTTPException(status_code=409, detail=Error.NOT_CANCELLABLE_ERROR)
+
+    session.commit()
+    session.refresh(job)
+
+    return JobPublic(**job.model_dump())
+
+
+@router.get("/{id}/result")
+def read_job_result(id: int, session: SessionDep) -> FileResponse:
+    """Downloads the result file of a succeeded background job."""
+
+    job = session.get(Job, id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail=Error.NOT_FOUND_ERROR)
+
+    if job.status != JobStatus.SUCCEEDED or not job.result_path:
+        raise HTTPException(status_code=409, detail=Error.NO_RESULT_ERROR)
+
+    path = Path(job.result_path)
+
+    return FileResponse(
+        path, media_type=RESULT_MEDIA_TYPES[path.suffix], filename=path.name
+    )
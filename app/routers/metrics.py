@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics")
+def read_metrics() -> Response:
+    """Returns Prometheus metrics of the service."""
+
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
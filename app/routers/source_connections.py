@@ -1,23 +1,83 @@
-from typing import Annotated
-
-from fastapi import APIRouter, HTTPException, Query
-
-from app.databases import DatabaseFactory
-from app.dependencies import SessionDep
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import chain
+from random import randrange
+from typing import Annotated, Any, Iterator, Literal, Sequence
+
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+
+from app import config
+from app.breakers import circuit_breakers
+from app.caches import invalidate_metadata, metadata_cache, metadata_key
+from app.databases import AsyncDatabaseFactory, DatabaseFactory
+from app.databases.engines import engine_registry
+from app.dependencies import AsyncSessionDep, SessionDep
+from app.exporters import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE, ArrowExporter
+from app.extractors import ParallelExtractor
+from app.models.schema_snapshot import SchemaSnapshot
 from app.models.source_connection import (
     SourceConnection,
+    SourceConnectionBulkUpdate,
     SourceConnectionCreate,
     SourceConnectionPublic,
+    SourceConnectionTestBatch,
     SourceConnectionUpdate,
 )
-from app.testers import SourceConnectionTester
+from app.models.watermark import Watermark
+from app.serializers import (
+    RowFormat,
+    RowsJSONResponse,
+    last_value,
+    to_json_lines,
+    to_ndjson,
+)
+from app.snapshots import diff_columns
+from app.testers import (
+    SourceConnectionBatchTester,
+    SourceConnectionBulkTester,
+    SourceConnectionTester,
+    run_source_connection_test,
+)
 from app.validators import SourceConnectionValidator
 
 NOT_FOUND_ERROR = "Source connection not found."
+DUPLICATE_ID_ERROR = "Source connection is updated more than once."
+INVALID_COLUMN_ERROR = "Columns must be given as table.column of a requested table."
 
 router = APIRouter(prefix="/source-connection", tags=["Source Connection"])
 
 
+def set_cache_headers(response: Response, hit: bool, age: float) -> None:
+    """Reports whether the response came from cache and how old its data is."""
+    response.headers["X-Cache"] = "HIT" if hit else "MISS"
+    response.headers["Age"] = str(int(age))
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Returns whether the client already has the response of the ETag."""
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def save_watermark_on_completion(
+    batches: Iterator[Sequence[Any]],
+    session: Session,
+    watermark: Watermark,
+    value: str,
+) -> Iterator[Sequence[Any]]:
+    """Yields the batches, then saves the watermark value once all were sent."""
+    yield from batches
+
+    watermark.value = value
+    watermark.updated_at = datetime.now(timezone.utc)
+    session.add(watermark)
+    session.commit()
+
+
 @router.post("/")
 def create_source_connection(
     source_connection: SourceConnectionCreate, session: SessionDep
@@ -42,22 +102,241 @@ def create_source_connection(
     return SourceConnectionPublic(**new_source_connection.model_dump())
 
 
+@router.post("/bulk")
+def create_source_connections(
+    source_connections: Annotated[
+        list[SourceConnectionCreate], Body(min_length=1, max_length=1000)
+    ],
+    session: SessionDep,
+    workers: Annotated[int, Query(gt=0, le=64)] = config.TEST_BATCH_WORKERS,
+    timeout: Annotated[float, Query(gt=0)] = config.TEST_BATCH_TIMEOUT,
+) -> list[dict[str, Any]]:
+    """
+    Creates many source connections.
+    Each is validated and tested concurrently, and the valid ones are saved
+    in one transaction. Returns the result of each, in the given order.
+    """
+
+    source_connection_dicts = [
+        source_connection.model_dump() for source_connection in source_connections
+    ]
+    source_connection_bulk_tester = SourceConnectionBulkTester(
+        source_connection_dicts, workers, timeout
+    )
+    results = source_connection_bulk_tester.test()
+
+    new_source_connections = {
+        index: SourceConnection(**source_connection_dicts[index])
+        for index, result in enumerate(results)
+        if result["success"]
+    }
+    session.add_all(new_source_connections.values())
+    session.flush()
+
+    for index, new_source_connection in new_source_connections.items():
+        results[index]["id"] = new_source_connection.id
+
+    session.commit()
+
+    return results
+
+
+@router.patch("/bulk")
+def update_source_connections(
+    source_connection_updates: Annotated[
+        list[SourceConnectionBulkUpdate], Body(min_length=1, max_length=1000)
+    ],
+    session: SessionDep,
+    workers: Annotated[int, Query(gt=0, le=64)] = config.TEST_BATCH_WORKERS,
+    timeout: Annotated[float, Query(gt=0)] = config.TEST_BATCH_TIMEOUT,
+) -> list[dict[str, Any]]:
+    """
+    Updates many source connections.
+    Each updated connection is validated and tested concurrently, and the
+    valid ones are saved in one transaction. Returns the result of each,
+    in the given order.
+    """
+
+    ids = [
+        source_connection_update.id
+        for source_connection_update in source_connection_updates
+    ]
+    source_connections = {
+        source_connection.id: source_connection
+        for source_connection in session.exec(
+            select(SourceConnection).where(SourceConnection.id.in_(ids))
+        ).all()
+    }
+
+    duplicate_ids = {id for id, count in Counter(ids).items() if count > 1}
+    results: list[dict[str, Any]] = [{} for _ in source_connection_updates]
+    updates: dict[int, dict[str, Any]] = {}
+
+    for index, source_connection_update in enumerate(source_connection_updates):
+        id = source_connection_update.id
+
+        if id not in source_connections:
+            results[index] = {"id": id, "success": False, "detail": NOT_FOUND_ERROR}
+        elif id in duplicate_ids:
+            results[index] = {"id": id, "success": False, "detail": DUPLICATE_ID_ERROR}
+        else:
+            updates[index] = source_connection_update.model_dump(
+                exclude_unset=True, exclude={"id"}
+            )
+
+    # updates are tested on copies, so that invalid ones are never saved
+    source_connection_dicts = [
+        {
+            **source_connections[source_connection_updates[index].id].model_dump(),
+            **update,
+        }
+        for index, update in updates.items()
+    ]
+    source_connection_bulk_tester = SourceConnectionBulkTester(
+        source_connection_dicts, workers, timeout
+    )
+
+    for (index, update), result in zip(
+        updates.items(), source_connection_bulk_tester.test()
+    ):
+        id = source_connection_updates[index].id
+        results[index] = {"id": id, **result}
+
+        if result["success"]:
+            source_connections[id].sqlmodel_update(update)
+            session.add(source_connections[id])
+
+    session.commit()
+
+    for result in results:
+        if result["success"]:
+            engine_registry.dispose(result["id"])
+            invalidate_metadata(result["id"])
+
+    return results
+
+
+@router.get("/")
+def read_source_connections(
+    session: SessionDep,
+    request: Request,
+    response: Response,
+    type: Literal["mysql", "postgresql"] | None = None,
+    host: str | None = None,
+    db: str | None = None,
+    after: int | None = None,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 100,
+) -> list[SourceConnectionPublic]:
+    """
+    Returns saved source connections ordered by id, filtered by type, host
+    and db. Pass the id given in the X-Next-After header as `after` for the
+    next page. Pages come with an ETag, and If-None-Match gets a 304 while
+    the page is unchanged.
+    """
+
+    statement = select(SourceConnection).order_by(SourceConnection.id).limit(limit)
+
+    if type:
+        statement = statement.where(SourceConnection.type == type)
+    if host:
+        statement = statement.where(SourceConnection.host == host)
+    if db:
+        statement = statement.where(SourceConnection.db == db)
+    if after is not None:
+        statement = statement.where(SourceConnection.id > after)
+
+    source_connections = [
+        SourceConnectionPublic(**source_connection.model_dump())
+        for source_connection in session.exec(statement).all()
+    ]
+    content = json.dumps(
+        [source_connection.model_dump() for source_connection in source_connections]
+    )
+    headers = {"ETag": f'"{hashlib.sha256(content.encode()).hexdigest()}"'}
+
+    if len(source_connections) == limit:
+        headers["X-Next-After"] = str(source_connections[-1].id)
+
+    if not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+
+    return source_connections
+
+
 @router.post("/test")
 def test_new_source_connection(
-    source_connection: SourceConnectionCreate,
-) -> dict[str, bool]:
-    """Tests source connection."""
+    source_connection: SourceConnectionCreate, response: Response, fresh: bool = False
+) -> dict[str, Any]:
+    """
+    Tests source connection.
+    Recent results of identical parameters are reused unless fresh.
+    """
 
     source_connection_dict = source_connection.model_dump()
-    source_connection_tester = SourceConnectionTester(source_connection_dict)
-    source_connection_tester.test()
+    result, age = run_source_connection_test(source_connection_dict, fresh)
+    set_cache_headers(response, age is not None, age or 0)
+
+    return result
+
+
+@router.post("/test-batch")
+def test_source_connection_batch(
+    source_connection_batch: SourceConnectionTestBatch,
+    session: SessionDep,
+    workers: Annotated[int, Query(gt=0, le=64)] = config.TEST_BATCH_WORKERS,
+    timeout: Annotated[float, Query(gt=0)] = config.TEST_BATCH_TIMEOUT,
+    fresh: bool = False,
+) -> StreamingResponse:
+    """
+    Tests many saved source connections concurrently.
+    Streams one newline-delimited JSON result per connection as each test completes.
+    """
+
+    statement = select(SourceConnection)
+
+    if not source_connection_batch.all:
+        statement = statement.where(
+            SourceConnection.id.in_(source_connection_batch.ids)
+        )
+
+    source_connection_dicts = [
+        source_connection.model_dump()
+        for source_connection in session.exec(statement).all()
+    ]
+    found_ids = {
+        source_connection["id"] for source_connection in source_connection_dicts
+    }
+    not_found = [
+        {"id": id, "success": False, "detail": NOT_FOUND_ERROR}
+        for id in source_connection_batch.ids
+        if id not in found_ids and not source_connection_batch.all
+    ]
+
+    source_connection_batch_tester = SourceConnectionBatchTester(
+        source_connection_dicts, workers, timeout, fresh
+    )
+    results = chain(not_found, source_connection_batch_tester.test())
+
+    return StreamingResponse(to_json_lines(results), media_type="application/x-ndjson")
+
 
-    return source_connection_tester.test_result()
+@router.get("/circuit-breakers")
+def read_circuit_breakers() -> list[dict[str, Any]]:
+    """Returns the circuit breaker state of every source database server."""
+
+    return circuit_breakers.status()
 
 
 @router.post("/{id}/test")
-def test_existing_source_connection(id: int, session: SessionDep) -> dict[str, bool]:
-    """Tests existing source connection."""
+def test_existing_source_connection(
+    id: int, session: SessionDep, response: Response, fresh: bool = False
+) -> dict[str, Any]:
+    """
+    Tests existing source connection.
+    Recent results of identical parameters are reused unless fresh.
+    """
 
     source_connection = session.get(SourceConnection, id)
 
@@ -65,10 +344,10 @@ def test_existing_source_connection(id: int, session: SessionDep) -> dict[str, b
         raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
 
     source_connection_dict = source_connection.model_dump()
-    source_connection_tester = SourceConnectionTester(source_connection_dict)
-    source_connection_tester.test()
+    result, age = run_source_connection_test(source_connection_dict, fresh)
+    set_cache_headers(response, age is not None, age or 0)
 
-    return source_connection_tester.test_result()
+    return result
 
 
 @router.patch("/{id}")
@@ -100,25 +379,367 @@ def update_source_connection(
     session.commit()
     session.refresh(source_connection)
 
+    engine_registry.dispose(id)
+    invalidate_metadata(id)
+
     return SourceConnectionPublic(**source_connection.model_dump())
 
 
 @router.get("/{id}/tables")
-def read_source_connection_tables(id: int, session: SessionDep):
+async def read_source_connection_tables(
+    id: int, session: AsyncSessionDep, response: Response
+):
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    source_connection_dict = source_connection.model_dump()
+    cache_key = metadata_key(source_connection_dict, "tables")
+    cached = metadata_cache.get(cache_key)
+
+    if cached:
+        table_names, age = cached
+    else:
+        database_factory = AsyncDatabaseFactory(source_connection_dict)
+        database = database_factory.get_database()
+        table_names, age = await database.get_table_names(), 0
+        metadata_cache.set(cache_key, table_names)
+
+    set_cache_headers(response, bool(cached), age)
+
+    return table_names
+
+
+@router.get("/{id}/table-schema")
+async def read_source_connection_table_schema(
+    id: int, session: AsyncSessionDep, response: Response
+):
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    source_connection_dict = source_connection.model_dump()
+    cache_key = metadata_key(source_connection_dict, "table-schema")
+    cached = metadata_cache.get(cache_key)
+
+    if cached:
+        table_schema, age = cached
+    else:
+        database_factory = AsyncDatabaseFactory(source_connection_dict)
+        database = database_factory.get_database()
+        table_schema, age = await database.get_table_schema(), 0
+        metadata_cache.set(cache_key, table_schema)
+
+    set_cache_headers(response, bool(cached), age)
+
+    return table_schema
+
+
+@router.get("/{id}/schema-diff")
+async def read_source_connection_schema_diff(id: int, session: AsyncSessionDep):
+    """
+    Returns the columns added, removed and changed since the last schema
+    snapshot of the table, all columns being added for the first snapshot.
+    A cheap catalog fingerprint is compared first, and the table is only
+    reflected and snapshotted again when it differs.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    snapshot = (
+        await session.exec(
+            select(SchemaSnapshot)
+            .where(
+                SchemaSnapshot.source_connection_id == id,
+                SchemaSnapshot.table_name == source_connection.table_name,
+            )
+            .order_by(SchemaSnapshot.id.desc())
+        )
+    ).first()
+
+    source_connection_dict = source_connection.model_dump()
+    database_factory = AsyncDatabaseFactory(source_connection_dict)
+    database = database_factory.get_database()
+    fingerprint = await database.get_schema_fingerprint()
+
+    if snapshot and snapshot.fingerprint == fingerprint:
+        return {
+            "fingerprint": fingerprint,
+            "previous_fingerprint": snapshot.fingerprint,
+            "snapshot_at": snapshot.created_at,
+            **diff_columns(snapshot.columns, snapshot.columns),
+        }
+
+    columns = await database.get_table_schema()
+    new_snapshot = SchemaSnapshot(
+        source_connection_id=id,
+        table_name=source_connection.table_name,
+        fingerprint=fingerprint,
+        columns=columns,
+        created_at=datetime.now(timezone.utc),
+    )
+    session.add(new_snapshot)
+    await session.commit()
+    await session.refresh(new_snapshot)
+
+    # cached table schemas are stale
+    invalidate_metadata(id)
+
+    return {
+        "fingerprint": fingerprint,
+        "previous_fingerprint": snapshot.fingerprint if snapshot else None,
+        "snapshot_at": new_snapshot.created_at,
+        **diff_columns(snapshot.columns if snapshot else [], columns),
+    }
+
+
+@router.get("/{id}/catalog")
+async def read_source_connection_catalog(
+    id: int, session: AsyncSessionDep, response: Response
+):
+    """
+    Returns every table of the source connection schema with its columns,
+    primary key, foreign keys, indexes and estimated row count.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    source_connection_dict = source_connection.model_dump()
+    cache_key = metadata_key(source_connection_dict, "catalog")
+    cached = metadata_cache.get(cache_key)
+
+    if cached:
+        catalog, age = cached
+    else:
+        database_factory = AsyncDatabaseFactory(source_connection_dict)
+        database = database_factory.get_database()
+        catalog, age = await database.get_catalog(), 0
+        metadata_cache.set(cache_key, catalog)
+
+    set_cache_headers(response, bool(cached), age)
+
+    return catalog
+
+
+@router.get("/{id}/table-stats")
+async def read_source_connection_table_stats(
+    id: int, session: AsyncSessionDep, exact: bool = False
+) -> dict[str, Any]:
+    """
+    Returns estimated row count, on-disk size and last analyzed time of table.
+    Estimates come from catalog statistics, an exact row count is opt-in.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    source_connection_dict = source_connection.model_dump()
+    database_factory = AsyncDatabaseFactory(source_connection_dict)
+    database = database_factory.get_database()
+
+    return await database.get_table_stats(exact)
+
+
+@router.post("/{id}/refresh-metadata")
+def refresh_source_connection_metadata(id: int, session: SessionDep) -> dict:
+    """Discards cached table names, schemas and catalog of source connection."""
+
     source_connection = session.get(SourceConnection, id)
 
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    invalidate_metadata(id)
+
+    return {"success": True}
+
+
+@router.get("/{id}/rows")
+async def read_source_connection_table_rows(
+    id: int,
+    session: AsyncSessionDep,
+    limit: Annotated[int, Query(le=100)] = 10,
+    format: RowFormat = "objects",
+    watermark: str | None = None,
+    since: str | None = None,
+    columns: Annotated[list[str] | None, Query()] = None,
+    filters: Annotated[list[str] | None, Query(alias="filter")] = None,
+    order: Annotated[list[str] | None, Query()] = None,
+    after: Annotated[list[str] | None, Query()] = None,
+):
+    """
+    Returns table rows as objects, or in the compact `arrays` and `columnar`
+    formats which give column names and types once, of the given columns only
+    if any, which must include the watermark and primary key columns when
+    paging by watermark.
+    Decimals are given as strings to keep their precision, bytes as base64.
+    Filters, given as `column:operator:value` with the operators eq, ne, lt,
+    le, gt, ge, like, in (comma separated values), null and notnull, and
+    order columns, prefixed with `-` for descending, apply on the database.
+    With a watermark column, rows come in its order after the `since` value,
+    and the value of the last row is returned in the X-Next-Watermark header.
+    Pass it as `since`, with the primary key values of the last row as
+    `after`, for the next page, so that rows sharing the last row's watermark
+    value aren't skipped.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
     if not source_connection:
         raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
 
     source_connection_dict = source_connection.model_dump()
-    database_factory = DatabaseFactory(source_connection_dict)
+    database_factory = AsyncDatabaseFactory(source_connection_dict)
     database = database_factory.get_database()
+    rows = await database.get_table_rows(
+        limit, format, watermark, since, columns, filters, order, after
+    )
+    headers = {}
 
-    return database.get_table_names()
+    if watermark is not None:
+        next_watermark = last_value(rows, format, watermark)
 
+        if next_watermark is not None:
+            headers["X-Next-Watermark"] = str(next_watermark)
+        elif since is not None:
+            headers["X-Next-Watermark"] = since
+
+    return RowsJSONResponse(rows, format, headers=headers)
+
+
+@router.get("/{id}/rows/tables")
+async def read_source_connection_tables_rows(
+    id: int,
+    session: AsyncSessionDep,
+    table: Annotated[list[str], Query(min_length=1, max_length=50)],
+    column: Annotated[list[str] | None, Query()] = None,
+    limit: Annotated[int, Query(le=100)] = 10,
+    format: RowFormat = "objects",
+):
+    """
+    Returns rows of many tables of the source connection schema, keyed by
+    table, fetched concurrently. Columns given as `table.column` restrict the
+    rows of their table to those columns.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    tables: dict[str, list[str] | None] = dict.fromkeys(table)
+
+    for table_column in column or []:
+        table_name, _, column_name = table_column.partition(".")
+
+        if table_name not in tables or not column_name:
+            raise HTTPException(status_code=422, detail=INVALID_COLUMN_ERROR)
+
+        tables[table_name] = [*(tables[table_name] or []), column_name]
+
+    source_connection_dict = source_connection.model_dump()
+    database_factory = AsyncDatabaseFactory(source_connection_dict)
+    database = database_factory.get_database()
+    rows = await database.get_tables_rows(tables, limit, format)
+
+    return RowsJSONResponse(rows, format)
+
+
+@router.get("/{id}/sample")
+async def get_source_connection_table_sample(
+    id: int,
+    session: AsyncSessionDep,
+    size: Annotated[int, Query(gt=0, le=10000)] = 100,
+    seed: Annotated[int | None, Query(ge=0, lt=2**31)] = None,
+    method: Literal["system", "bernoulli"] = "system",
+) -> dict[str, Any]:
+    """
+    Returns about size random table rows, sampled on the database server.
+    The same seed returns the same rows while the table is unchanged.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    if seed is None:
+        seed = randrange(2**31)
+
+    source_connection_dict = source_connection.model_dump()
+    database_factory = AsyncDatabaseFactory(source_connection_dict)
+    database = database_factory.get_database()
+    rows = await database.get_table_sample(size, seed, method)
+
+    return {"seed": seed, "rows": rows}
+
+
+@router.get("/{id}/profile")
+async def read_source_connection_table_profile(
+    id: int,
+    session: AsyncSessionDep,
+    response: Response,
+    sample_size: Annotated[int | None, Query(gt=0, le=1000000)] = None,
+    seed: Annotated[int, Query(ge=0, lt=2**31)] = 0,
+    approximate: bool = True,
+) -> dict[str, Any]:
+    """
+    Returns per column null count, distinct count, min, max and average length,
+    computed on the database server over the whole table or a sample of it.
+    """
+
+    source_connection = await session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    source_connection_dict = source_connection.model_dump()
+    cache_key = metadata_key(
+        source_connection_dict, f"profile:{sample_size}:{seed}:{approximate}"
+    )
+    cached = metadata_cache.get(cache_key)
+
+    if cached:
+        profile, age = cached
+    else:
+        database_factory = AsyncDatabaseFactory(source_connection_dict)
+        database = database_factory.get_database()
+        profile = await database.get_table_profile(sample_size, seed, approximate)
+        age = 0
+        metadata_cache.set(cache_key, profile)
+
+    set_cache_headers(response, bool(cached), age)
+
+    return profile
+
+
+@router.get("/{id}/rows/stream")
+def stream_source_connection_table_rows(
+    id: int,
+    session: SessionDep,
+    after: Annotated[list[str] | None, Query()] = None,
+    limit: Annotated[int | None, Query(gt=0)] = None,
+    batch_size: Annotated[int, Query(gt=0, le=10000)] = 1000,
+    columns: Annotated[list[str] | None, Query()] = None,
+    filters: Annotated[list[str] | None, Query(alias="filter")] = None,
+) -> StreamingResponse:
+    """
+    Streams table rows as newline-delimited JSON, ordered by primary key.
+    Pass the primary key values of the last received row as `after` to resume.
+    Rows are restricted to the given columns and filters, as for `/rows`,
+    the columns including the primary key columns.
+    """
 
-@router.get("/{id}/table-schema")
-def read_source_connection_table_schema(id: int, session: SessionDep):
     source_connection = session.get(SourceConnection, id)
 
     if not source_connection:
@@ -127,14 +748,101 @@ def read_source_connection_table_schema(id: int, session: SessionDep):
     source_connection_dict = source_connection.model_dump()
     database_factory = DatabaseFactory(source_connection_dict)
     database = database_factory.get_database()
+    batches = database.stream_table_rows(after, limit, batch_size, columns, filters)
+
+    return StreamingResponse(to_ndjson(batches), media_type="application/x-ndjson")
+
+
+@router.get("/{id}/rows/changes")
+def stream_source_connection_changed_rows(
+    id: int,
+    session: SessionDep,
+    watermark: str,
+    since: str | None = None,
+    save: bool = False,
+    batch_size: Annotated[int, Query(gt=0, le=10000)] = 1000,
+) -> StreamingResponse:
+    """
+    Streams table rows changed after a watermark value as newline-delimited
+    JSON, in watermark order, up to the highest current value which is
+    returned in the X-Watermark header.
+    The saved watermark of the column is used if `since` is not given, and is
+    moved forward once the stream completes if `save` is set.
+    """
 
-    return database.get_table_schema()
+    source_connection = session.get(SourceConnection, id)
 
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    saved_watermark = session.exec(
+        select(Watermark).where(
+            Watermark.source_connection_id == id,
+            Watermark.table_name == source_connection.table_name,
+            Watermark.column == watermark,
+        )
+    ).first()
+
+    if since is None and saved_watermark:
+        since = saved_watermark.value
+
+    source_connection_dict = source_connection.model_dump()
+    database_factory = DatabaseFactory(source_connection_dict)
+    database = database_factory.get_database()
+    until = database.get_watermark(watermark)
+
+    if until is None:
+        return StreamingResponse(iter(()), media_type="application/x-ndjson")
+
+    batches = database.stream_changed_rows(watermark, since, until, batch_size)
+
+    if save:
+        saved_watermark = saved_watermark or Watermark(
+            source_connection_id=id,
+            table_name=source_connection.table_name,
+            column=watermark,
+        )
+        batches = save_watermark_on_completion(
+            batches, session, saved_watermark, str(until)
+        )
+
+    return StreamingResponse(
+        to_ndjson(batches),
+        media_type="application/x-ndjson",
+        headers={"X-Watermark": str(until)},
+    )
+
+
+@router.get("/{id}/watermarks")
+def read_source_connection_watermarks(id: int, session: SessionDep) -> list[Watermark]:
+    """Returns the saved watermarks of the source connection."""
+
+    source_connection = session.get(SourceConnection, id)
+
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    return session.exec(
+        select(Watermark).where(Watermark.source_connection_id == id)
+    ).all()
+
+
+@router.get("/{id}/rows/parallel")
+def extract_source_connection_table_rows(
+    id: int,
+    session: SessionDep,
+    parallelism: Annotated[
+        int, Query(gt=0, le=config.SOURCE_POOL_SIZE + config.SOURCE_MAX_OVERFLOW)
+    ] = config.EXTRACT_PARALLELISM,
+    chunk_size: Annotated[int, Query(gt=0)] = config.EXTRACT_CHUNK_SIZE,
+    ordered: bool = True,
+) -> StreamingResponse:
+    """
+    Streams all table rows as newline-delimited JSON, reading primary key or
+    block ranges of the table concurrently over several connections.
+    Unordered streams send each range as soon as it is read.
+    """
 
-@router.get("/{id}/rows")
-def read_source_connection_table_rows(
-    id: int, session: SessionDep, limit: Annotated[int, Query(le=100)] = 10
-):
     source_connection = session.get(SourceConnection, id)
 
     if not source_connection:
@@ -143,8 +851,48 @@ def read_source_connection_table_rows(
     source_connection_dict = source_connection.model_dump()
     database_factory = DatabaseFactory(source_connection_dict)
     database = database_factory.get_database()
+    extractor = ParallelExtractor(database, parallelism, chunk_size, ordered)
+
+    return StreamingResponse(
+        to_ndjson(extractor.extract()), media_type="application/x-ndjson"
+    )
+
+
+@router.get("/{id}/rows/export")
+def export_source_connection_table_rows(
+    id: int,
+    session: SessionDep,
+    format: Literal["arrow", "parquet"] = "arrow",
+    limit: Annotated[int | None, Query(gt=0)] = None,
+    batch_size: Annotated[int, Query(gt=0, le=100000)] = 10000,
+) -> StreamingResponse:
+    """
+    Exports table rows as an Apache Arrow IPC stream or a Parquet file,
+    typed after the reflected table columns.
+    """
+
+    source_connection = session.get(SourceConnection, id)
 
-    return database.get_table_rows(limit)
+    if not source_connection:
+        raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
+
+    source_connection_dict = source_connection.model_dump()
+    database_factory = DatabaseFactory(source_connection_dict)
+    database = database_factory.get_database()
+    arrow_exporter = ArrowExporter(database.get_table_columns())
+    batches = database.stream_table_rows(limit=limit, batch_size=batch_size)
+
+    if format == "parquet":
+        filename = f"{source_connection.table_name}.parquet"
+        return StreamingResponse(
+            arrow_exporter.to_parquet(batches),
+            media_type=PARQUET_MEDIA_TYPE,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    return StreamingResponse(
+        arrow_exporter.to_arrow_stream(batches), media_type=ARROW_MEDIA_TYPE
+    )
 
 
 @router.delete("/{id}")
@@ -156,7 +904,20 @@ def delete_source_connection(id: int, session: SessionDep) -> dict:
     if not source_connection:
         raise HTTPException(status_code=404, detail=NOT_FOUND_ERROR)
 
+    for watermark in session.exec(
+        select(Watermark).where(Watermark.source_connection_id == id)
+    ):
+        session.delete(watermark)
+
+    for snapshot in session.exec(
+        select(SchemaSnapshot).where(SchemaSnapshot.source_connection_id == id)
+    ):
+        session.delete(snapshot)
+
     session.delete(source_connection)
     session.commit()
 
+    engine_registry.dispose(id)
+    invalidate_metadata(id)
+
     return {"success": True}
@@ -0,0 +1,93 @@
+"""Serialization of source table rows."""
+
+import base64
+import json
+from decimal import Decimal
+from typing import Any, Iterator, Literal, Sequence
+
+import orjson
+from fastapi.responses import JSONResponse
+
+from app.metrics import SERIALIZATION_DURATION, timed
+
+RowFormat = Literal["objects", "arrays", "columnar"]
+
+
+def to_ndjson(batches: Iterator[Sequence[Any]]) -> Iterator[str]:
+    """Yields one chunk of newline-delimited JSON objects per batch of rows."""
+    for batch in batches:
+        with timed(SERIALIZATION_DURATION, "ndjson"):
+            chunk = "".join(
+                json.dumps(row._asdict(), default=str) + "\n" for row in batch
+            )
+
+        yield chunk
+
+
+def to_json_lines(items: Iterator[dict[str, Any]]) -> Iterator[str]:
+    """Yields each item as a line of newline-delimited JSON."""
+    for item in items:
+        yield json.dumps(item, default=str) + "\n"
+
+
+def _default(value: Any) -> Any:
+    # orjson serializes datetime, date, time and UUID natively
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(value).decode()
+    return str(value)
+
+
+def shape_rows(
+    columns: list[dict[str, Any]], rows: Sequence[Sequence[Any]], format: RowFormat
+) -> Any:
+    """
+    Returns rows as objects, or with column names and types once followed by
+    rows as arrays, or by one array of values per column.
+    """
+    names = [column["name"] for column in columns]
+
+    if format == "objects":
+        return [dict(zip(names, row)) for row in rows]
+
+    header = [
+        {"name": name, "type": str(column["type"])}
+        for name, column in zip(names, columns)
+    ]
+
+    if format == "arrays":
+        return {"columns": header, "rows": [list(row) for row in rows]}
+
+    values = [list(values) for values in zip(*rows)] if rows else [[] for _ in names]
+    return {"columns": header, "values": values}
+
+
+def last_value(rows: Any, format: RowFormat, name: str) -> Any:
+    """Returns the value of a column in the last of the shaped rows, or None."""
+    if format == "objects":
+        return rows[-1][name] if rows else None
+
+    index = [column["name"] for column in rows["columns"]].index(name)
+
+    if format == "arrays":
+        return rows["rows"][-1][index] if rows["rows"] else None
+
+    values = rows["values"][index]
+    return values[-1] if values else None
+
+
+class RowsJSONResponse(JSONResponse):
+    """
+    JSON response of shaped rows rendered by orjson, with decimals as strings
+    to keep their precision and bytes as base64. Rendering is timed as objects
+    or compact, for both compact formats.
+    """
+
+    def __init__(self, content: Any, format: RowFormat, **kwargs: Any) -> None:
+        self.__format = "objects" if format == "objects" else "compact"
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        with timed(SERIALIZATION_DURATION, self.__format):
+            return orjson.dumps(content, default=_default)
@@ -0,0 +1,21 @@
+"""Comparison of table schema snapshots."""
+
+from typing import Any
+
+
+def diff_columns(
+    before: list[dict[str, Any]], after: list[dict[str, Any]]
+) -> dict[str, list[dict[str, Any]]]:
+    """Returns the columns added, removed and changed between two schemas."""
+    before_columns = {column["name"]: column for column in before}
+    after_columns = {column["name"]: column for column in after}
+
+    return {
+        "added": [column for column in after if column["name"] not in before_columns],
+        "removed": [column for column in before if column["name"] not in after_columns],
+        "changed": [
+            {"name": name, "before": before_columns[name], "after": column}
+            for name, column in after_columns.items()
+            if name in before_columns and before_columns[name] != column
+        ],
+    }
@@ -1,13 +1,24 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from enum import Enum
+from math import ceil
 from os import getenv
-from typing import Any
+from time import monotonic, perf_counter
+from typing import Any, Callable, Iterator
 
 from fastapi import HTTPException
 from pydantic import BaseModel
-from sqlalchemy.exc import OperationalError
-from sqlalchemy_utils import database_exists
+from sqlalchemy import NullPool
+from sqlalchemy.exc import DBAPIError, OperationalError
 from sqlmodel import create_engine, inspect, text
 
+from app import config
+from app.breakers import CircuitOpenError, circuit_breakers, host_key, is_unreachable
+from app.caches import test_result_cache, test_result_key, unreachable_host_cache
+from app.databases.engines import connect_args, connect_timeout, statement_timeout
+from app.metrics import TEST_CHECK_DURATION, instrument
+from app.validators import SourceConnectionValidator
+
 
 class Error(str, Enum):
     INVALID_CREDENTIALS_ERROR = "Database server or credentials is invalid."
@@ -17,6 +28,7 @@ class Error(str, Enum):
     SUPPORTED_VERSION_ERROR = "Database version is not supported."
     USER_CREATE_SCHEMA_PRIVILEGE_ERROR = "User has no create privilege in schema."
     USER_CREATE_DATABASE_PRIVILEGE_ERROR = "User has no create privilege in database."
+    TEST_TIMEOUT_ERROR = "Source connection test timed out."
 
 
 class TestResult(BaseModel):
@@ -29,9 +41,39 @@ class TestResult(BaseModel):
     user_create_database_privilege: bool | None = None
 
 
+def bounded_timeouts(
+    source_connection: dict[str, Any], timeout: float
+) -> dict[str, Any]:
+    """
+    Returns the source connection with its connect and statement timeouts
+    bounded by the given timeout, and set to it if disabled.
+    """
+    seconds = max(ceil(timeout), 1)
+
+    return {
+        **source_connection,
+        "connect_timeout": min(connect_timeout(source_connection) or seconds, seconds),
+        "statement_timeout": min(
+            statement_timeout(source_connection) or seconds, seconds
+        ),
+    }
+
+
 class SourceConnectionTester:
+    """
+    Tests a source connection with at most one user and one admin connection.
+    The admin privilege check runs concurrently with the user connection checks.
+    Servers found unreachable are not connected to again for a while, unless fresh.
+    Given a timeout, the connection timeouts are bounded by it, so that a test
+    abandoned after the timeout ends soon after.
+    """
+
     def __init__(
-        self, source_connection: dict[str, Any], raise_exceptions: bool = False
+        self,
+        source_connection: dict[str, Any],
+        raise_exceptions: bool = False,
+        fresh: bool = False,
+        timeout: float | None = None,
     ) -> None:
         self.__type = source_connection["type"]
         self.__table = source_connection["table_name"]
@@ -44,6 +86,10 @@ class SourceConnectionTester:
         self.__db = source_connection["db"]
 
         self.__raise_exceptions = raise_exceptions
+        self.__fresh = fresh
+        self.__source_connection = source_connection
+        self.__timeout = timeout
+        self.__host_key = host_key(source_connection)
 
         self.__credentials_mapping = {
             "mysql": {
@@ -68,11 +114,44 @@ class SourceConnectionTester:
             self.__result.user_create_schema_privilege = False
             self.__result.user_create_database_privilege = False
 
+        # milliseconds spent per check
+        self.__timings: dict[str, float] = {}
+
     def __url(self, user: str | None = None, password: str | None = None):
-        connection_mapping = {"mysql": "mysql+pymysql", "postgresql": "postgresql"}
+        connection_mapping = {
+            "mysql": "mysql+pymysql",
+            "postgresql": "postgresql+psycopg2",
+        }
 
         return f"{connection_mapping[self.__type]}://{user or self.__user}:{password or self.__password}@{self.__host}:{self.__port}/{self.__db}"
 
+    def __engine(self, user: str | None = None, password: str | None = None):
+        url = self.__url(user, password)
+        source_connection = (
+            bounded_timeouts(self.__source_connection, self.__timeout)
+            if self.__timeout
+            else self.__source_connection
+        )
+        engine = create_engine(
+            url,
+            poolclass=NullPool,
+            connect_args=connect_args(source_connection, url),
+        )
+        instrument(engine)
+        circuit_breakers.guard(engine, self.__source_connection)
+
+        return engine
+
+    @contextmanager
+    def __timed(self, check: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            self.__timings[check] = round(elapsed * 1000, 2)
+            TEST_CHECK_DURATION.labels(check, self.__type).observe(elapsed)
+
     def __version(self, session):
         version_fallback = [0, 0]
         version_tuple = session.dialect.server_version_info or version_fallback
@@ -81,37 +160,12 @@ class SourceConnectionTester:
 
         return float(version_string)
 
-    def __test_database(self, engine):
-        try:
-            connection = engine.connect()
-            connection.close()
-            self.__result.valid_credentials = True
-        except OperationalError:
-            self.__result.valid_credentials = False
-
-        if self.__raise_exceptions and not self.__result.valid_credentials:
-            raise HTTPException(status_code=422, detail=Error.INVALID_CREDENTIALS_ERROR)
-
-        try:
-            self.__result.valid_database = database_exists(engine.url)
-        except OperationalError:
-            self.__result.valid_database = False
-
-        if self.__raise_exceptions and not self.__result.valid_database:
-            raise HTTPException(status_code=422, detail=Error.INVALID_DATABASE_ERROR)
-
     def __test_table(self, inspector):
         self.__result.valid_table = self.__table in inspector.get_table_names()
 
-        if self.__raise_exceptions and not self.__result.valid_table:
-            raise HTTPException(status_code=422, detail=Error.INVALID_TABLE_ERROR)
-
     def __test_schema(self, inspector):
         self.__result.valid_schema = self.__schema in inspector.get_schema_names()
 
-        if self.__raise_exceptions and not self.__result.valid_schema:
-            raise HTTPException(status_code=422, detail=Error.INVALID_SCHEMA_ERROR)
-
     def __test_version(self, session):
         current_version = self.__version(session)
         supported_versions = {"mysql": [5.5, 8], "postgresql": [10]}
@@ -119,59 +173,286 @@ class SourceConnectionTester:
             self.__type
         ] or current_version > max(supported_versions[self.__type])
 
-        if self.__raise_exceptions and not self.__result.supported_version:
-            raise HTTPException(status_code=422, detail=Error.SUPPORTED_VERSION_ERROR)
+    def __test_user_connection(self):
+        """
+        Runs the user checks on a single connection.
+        Connecting to the database validates both credentials and database.
+        """
+        engine = self.__engine()
 
-    def __test_user_schema_privilege(self):
-        user = self.__credentials_mapping[self.__type]["user"]
-        password = self.__credentials_mapping[self.__type]["password"]
-        engine = create_engine(self.__url(user, password))
-        with engine.connect() as session:
-            statement = f"SELECT pg_catalog.has_schema_privilege('{self.__user}', '{self.__schema}', 'CREATE');"
-            schema_privilege = session.execute(text(statement))
-            for result in schema_privilege:
-                self.__result.user_create_schema_privilege = True in result
-
-        if self.__raise_exceptions and not self.__result.user_create_schema_privilege:
-            raise HTTPException(
-                status_code=422, detail=Error.USER_CREATE_SCHEMA_PRIVILEGE_ERROR
-            )
+        try:
+            with self.__timed("connect"):
+                session = engine.connect()
+        except OperationalError as error:
+            if is_unreachable(error):
+                unreachable_host_cache.set(self.__host_key, True)
+            return
+        except CircuitOpenError:
+            return
+
+        with session:
+            self.__result.valid_credentials = True
+            self.__result.valid_database = True
+
+            inspector = inspect(session)
 
-    def __test_user_database_privilege(self):
+            with self.__timed("table"):
+                self.__test_table(inspector)
+
+            with self.__timed("version"):
+                self.__test_version(session)
+
+            if self.__type == "postgresql":
+                with self.__timed("schema"):
+                    self.__test_schema(inspector)
+
+    def __test_user_privileges(self) -> tuple[bool, bool]:
+        """
+        Checks the user schema and database create privileges in a single query,
+        on an admin connection.
+        """
         user = self.__credentials_mapping[self.__type]["user"]
         password = self.__credentials_mapping[self.__type]["password"]
-        engine = create_engine(self.__url(user, password))
-        with engine.connect() as session:
-            statement = f"SELECT pg_catalog.has_database_privilege('{self.__user}', '{self.__db}', 'CREATE');"
-            db_privilege = session.execute(text(statement))
-            for result in db_privilege:
-                self.__result.user_create_database_privilege = True in result
-
-        if self.__raise_exceptions and not self.__result.user_create_database_privilege:
-            raise HTTPException(
-                status_code=422, detail=Error.USER_CREATE_DATABASE_PRIVILEGE_ERROR
-            )
+        engine = self.__engine(user, password)
+        statement = text(
+            "SELECT "
+            "CASE WHEN EXISTS "
+            "(SELECT 1 FROM pg_catalog.pg_namespace WHERE nspname = :schema) "
+            "THEN pg_catalog.has_schema_privilege(:user, :schema, 'CREATE') "
+            "ELSE false END, "
+            "pg_catalog.has_database_privilege(:user, :db, 'CREATE');"
+        )
 
-    def test(self):
-        engine = create_engine(self.__url())
-        self.__test_database(engine)
+        with self.__timed("privileges"):
+            try:
+                with engine.connect() as session:
+                    privileges = session.execute(
+                        statement,
+                        {"user": self.__user, "schema": self.__schema, "db": self.__db},
+                    ).one()
+            except (DBAPIError, CircuitOpenError):
+                return False, False
+
+        return bool(privileges[0]), bool(privileges[1])
+
+    def __raise_first_error(self):
+        errors = [
+            ("valid_credentials", Error.INVALID_CREDENTIALS_ERROR),
+            ("valid_database", Error.INVALID_DATABASE_ERROR),
+            ("valid_table", Error.INVALID_TABLE_ERROR),
+            ("supported_version", Error.SUPPORTED_VERSION_ERROR),
+            ("valid_schema", Error.INVALID_SCHEMA_ERROR),
+            ("user_create_schema_privilege", Error.USER_CREATE_SCHEMA_PRIVILEGE_ERROR),
+            (
+                "user_create_database_privilege",
+                Error.USER_CREATE_DATABASE_PRIVILEGE_ERROR,
+            ),
+        ]
+
+        for field, error in errors:
+            if getattr(self.__result, field) is False:
+                raise HTTPException(status_code=422, detail=error)
 
-        if not self.__result.valid_database:
+    def test(self):
+        if not self.__fresh and unreachable_host_cache.get(self.__host_key):
+            self.__timings["total"] = 0
+            if self.__raise_exceptions:
+                self.__raise_first_error()
             return
 
-        inspector = inspect(engine)
-        self.__test_table(inspector)
+        executor = ThreadPoolExecutor(max_workers=1)
+
+        with self.__timed("total"):
+            privileges = (
+                executor.submit(self.__test_user_privileges)
+                if self.__type == "postgresql"
+                else None
+            )
 
-        with engine.connect() as session:
-            self.__test_version(session)
+            try:
+                self.__test_user_connection()
 
-            if self.__type == "postgresql":
-                self.__test_schema(inspector)
-                self.__test_user_schema_privilege()
-                self.__test_user_database_privilege()
+                if privileges and self.__result.valid_database:
+                    (
+                        self.__result.user_create_schema_privilege,
+                        self.__result.user_create_database_privilege,
+                    ) = privileges.result()
+            finally:
+                # don't wait for the admin check when the user checks failed
+                executor.shutdown(wait=False)
+
+        if self.__raise_exceptions:
+            self.__raise_first_error()
 
     def test_result(self):
         result_dict = self.__result.model_dump(exclude_unset=True)
         result_dict["success"] = all(result_dict.values())
+        result_dict["timings"] = self.__timings
 
         return result_dict
+
+
+def run_source_connection_test(
+    source_connection: dict[str, Any],
+    fresh: bool = False,
+    timeout: float | None = None,
+) -> tuple[dict[str, Any], float | None]:
+    """
+    Tests source connection, reusing a recent result of identical parameters.
+    Successes and failures are kept for different times.
+    Returns the result and its age in seconds, None if it was just tested.
+    """
+    cache_key = test_result_key(source_connection)
+    cached = None if fresh else test_result_cache.get(cache_key)
+
+    if cached:
+        return cached
+
+    source_connection_tester = SourceConnectionTester(
+        source_connection, fresh=fresh, timeout=timeout
+    )
+    source_connection_tester.test()
+    result = source_connection_tester.test_result()
+
+    ttl = (
+        config.TEST_RESULT_SUCCESS_TTL
+        if result["success"]
+        else config.TEST_RESULT_FAILURE_TTL
+    )
+    test_result_cache.set(cache_key, result, ttl)
+
+    return result, None
+
+
+def error_detail(error: BaseException) -> str:
+    """
+    Returns the detail of a failed test. Driver messages may contain hosts
+    and users, so errors other than the tester's own are reported as invalid.
+    """
+    if isinstance(error, HTTPException):
+        return error.detail
+
+    return Error.INVALID_CREDENTIALS_ERROR
+
+
+def run_tests(
+    test: Callable[[int], dict[str, Any]], count: int, workers: int, timeout: float
+) -> Iterator[tuple[int, dict[str, Any]]]:
+    """
+    Runs the tests of indexes 0 to count with a bounded worker pool, and
+    yields each index with its result as each test completes. A test running
+    longer than the timeout, from when a worker starts it, is yielded as
+    timed out instead of stalling the others.
+    """
+    started: dict[int, float] = {}
+
+    def run(index: int) -> dict[str, Any]:
+        started[index] = monotonic()
+        return test(index)
+
+    def next_deadline() -> float:
+        now = monotonic()
+        remaining = [
+            started[index] + timeout - now
+            for index in pending.values()
+            if index in started
+        ]
+        return max(min(remaining, default=timeout), 0)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending: dict[Future, int] = {
+        executor.submit(run, index): index for index in range(count)
+    }
+
+    try:
+        while pending:
+            done, _ = wait(pending, next_deadline(), FIRST_COMPLETED)
+
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    yield index, future.result()
+                except Exception as error:
+                    yield index, {"success": False, "detail": error_detail(error)}
+
+            now = monotonic()
+            for future, index in list(pending.items()):
+                if index in started and now - started[index] >= timeout:
+                    del pending[future]
+                    yield index, {"success": False, "detail": Error.TEST_TIMEOUT_ERROR}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SourceConnectionBatchTester:
+    """
+    Tests many saved source connections concurrently with a bounded worker pool.
+    Results are yielded as each test completes. A test running longer than
+    the timeout is reported as timed out instead of stalling the batch.
+    The timeout of each test starts when a worker starts it, not while it is
+    queued, and also bounds its connection timeouts, so abandoned tests end
+    and free their worker.
+    """
+
+    def __init__(
+        self,
+        source_connections: list[dict[str, Any]],
+        workers: int,
+        timeout: float,
+        fresh: bool = False,
+    ) -> None:
+        self.__source_connections = source_connections
+        self.__workers = workers
+        self.__timeout = timeout
+        self.__fresh = fresh
+
+    def __test(self, index: int) -> dict[str, Any]:
+        result, _ = run_source_connection_test(
+            self.__source_connections[index], self.__fresh, self.__timeout
+        )
+
+        return result
+
+    def test(self) -> Iterator[dict[str, Any]]:
+        for index, result in run_tests(
+            self.__test, len(self.__source_connections), self.__workers, self.__timeout
+        ):
+            yield {"id": self.__source_connections[index]["id"], **result}
+
+
+class SourceConnectionBulkTester:
+    """
+    Validates and tests many source connection definitions concurrently with
+    a bounded worker pool, as creating or updating one does.
+    Results are in the order of the definitions. Timeouts apply to each test
+    as in SourceConnectionBatchTester.
+    """
+
+    def __init__(
+        self, source_connections: list[dict[str, Any]], workers: int, timeout: float
+    ) -> None:
+        self.__source_connections = source_connections
+        self.__workers = workers
+        self.__timeout = timeout
+
+    def __test(self, index: int) -> dict[str, Any]:
+        source_connection = self.__source_connections[index]
+        source_connection_validator = SourceConnectionValidator(source_connection)
+        source_connection_validator.validate()
+
+        source_connection_tester = SourceConnectionTester(
+            source_connection, raise_exceptions=True, timeout=self.__timeout
+        )
+        source_connection_tester.test()
+
+        return {"success": True}
+
+    def test(self) -> list[dict[str, Any]]:
+        results: list[dict[str, Any]] = [{}] * len(self.__source_connections)
+
+        for index, result in run_tests(
+            self.__test, len(self.__source_connections), self.__workers, self.__timeout
+        ):
+            results[index] = result
+
+        return results
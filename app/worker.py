@@ -0,0 +1,29 @@
+"""
+Job worker process, running queued background jobs of the app database.
+
+Usage: python -m app.worker --workers 4
+"""
+
+import argparse
+import signal
+from threading import Event
+
+from app import config
+from app.databases.sqlite import create_db_and_tables, engine
+from app.jobs import JobWorkerPool
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=config.JOB_WORKERS)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    job_workers = JobWorkerPool(engine, args.workers)
+    job_workers.start()
+
+    stopped = Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    stopped.wait()
+
+    job_workers.stop(timeout=config.JOB_SHUTDOWN_TIMEOUT)
@@ -0,0 +1,79 @@
+"""
+Load benchmark of blocking versus async source database access.
+
+Simulates many concurrent slow source databases with a sleeping query and runs
+it once per source, first through the threadpool like sync routes do, then
+through an async engine like async routes do. Prints the throughput of both.
+
+Usage: python benchmarks/async_routes.py --type mysql --sources 100 --delay 0.5
+"""
+
+import argparse
+import asyncio
+from time import perf_counter
+
+from anyio import to_thread
+from sources import url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine, text
+
+DRIVERS = {
+    "mysql": ("mysql+pymysql", "mysql+aiomysql"),
+    "postgresql": ("postgresql+psycopg2", "postgresql+asyncpg"),
+}
+SLEEP_STATEMENTS = {
+    "mysql": "SELECT SLEEP(:delay)",
+    "postgresql": "SELECT pg_sleep(:delay)",
+}
+
+
+async def run_blocking(type: str, sources: int, delay: float) -> float:
+    engine = create_engine(url(type, DRIVERS[type][0]), pool_size=sources)
+    statement = text(SLEEP_STATEMENTS[type])
+
+    def query():
+        with engine.connect() as connection:
+            connection.execute(statement, {"delay": delay})
+
+    # threadpool is limited to 40 threads by default, like fastapi sync routes
+    started = perf_counter()
+    await asyncio.gather(*[to_thread.run_sync(query) for _ in range(sources)])
+    elapsed = perf_counter() - started
+
+    engine.dispose()
+    return elapsed
+
+
+async def run_async(type: str, sources: int, delay: float) -> float:
+    engine = create_async_engine(url(type, DRIVERS[type][1]), pool_size=sources)
+    statement = text(SLEEP_STATEMENTS[type])
+
+    async def query():
+        async with engine.connect() as connection:
+            await connection.execute(statement, {"delay": delay})
+
+    started = perf_counter()
+    await asyncio.gather(*[query() for _ in range(sources)])
+    elapsed = perf_counter() - started
+
+    await engine.dispose()
+    return elapsed
+
+
+async def main(type: str, sources: int, delay: float):
+    for name, run in [("blocking", run_blocking), ("async", run_async)]:
+        elapsed = await run(type, sources, delay)
+        print(
+            f"{name:>8}: {sources} sources in {elapsed:.2f}s, "
+            f"{sources / elapsed:.1f} requests/s"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--type", choices=DRIVERS.keys(), default="mysql")
+    parser.add_argument("--sources", type=int, default=100)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.type, args.sources, args.delay))
@@ -0,0 +1,232 @@
+"""
+Latency and throughput benchmark of the API routes against seeded tables.
+
+Runs every scenario at each concurrency level against the running API, over a
+source connection to a table seeded with seed.py, and writes the results as
+JSON. Given a baseline results file, compares against it and exits with an
+error status if any scenario regressed by more than the tolerance.
+
+Usage: python benchmarks/routes.py --type mysql --table bench_0 --concurrency 1 8 32 --output results.json --baseline baseline.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Callable
+
+import httpx
+from sources import source_connection
+
+# scenario name: (method, path, query parameters), {id} is the source connection
+SCENARIOS: dict[str, tuple[str, str, dict[str, Any]]] = {
+    "create": ("POST", "/source-connection/", {}),
+    "test": ("POST", "/source-connection/{id}/test", {"fresh": "true"}),
+    "test-cached": ("POST", "/source-connection/{id}/test", {}),
+    "tables": ("GET", "/source-connection/{id}/tables", {}),
+    "table-schema": ("GET", "/source-connection/{id}/table-schema", {}),
+    "rows": ("GET", "/source-connection/{id}/rows", {"limit": 100}),
+    "rows-compact": (
+        "GET",
+        "/source-connection/{id}/rows",
+        {"limit": 100, "format": "arrays"},
+    ),
+    "stream": ("GET", "/source-connection/{id}/rows/stream", {}),
+    "parallel": ("GET", "/source-connection/{id}/rows/parallel", {}),
+    "export-arrow": ("GET", "/source-connection/{id}/rows/export", {}),
+    "export-parquet": (
+        "GET",
+        "/source-connection/{id}/rows/export",
+        {"format": "parquet"},
+    ),
+}
+# scenarios reading whole tables, run with fewer requests
+FULL_TABLE_SCENARIOS = {"stream", "parallel", "export-arrow", "export-parquet"}
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = min(int(len(ordered) * percent / 100), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_scenario(
+    send: Callable[[], httpx.Response], requests: int, concurrency: int
+) -> dict[str, Any]:
+    def timed_send() -> tuple[float, int, bool]:
+        started = perf_counter()
+        response = send()
+        return perf_counter() - started, len(response.content), response.is_success
+
+    send()  # warm up engines and caches
+
+    started = perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: timed_send(), range(requests)))
+    elapsed = perf_counter() - started
+
+    latencies = [latency * 1000 for latency, _, _ in results]
+    return {
+        "requests": requests,
+        "errors": sum(not success for _, _, success in results),
+        "throughput": round(requests / elapsed, 2),
+        "bytes_per_second": round(sum(size for _, size, _ in results) / elapsed),
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 2),
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies), 2),
+        },
+    }
+
+
+def run(
+    base_url: str,
+    payload: dict[str, Any],
+    scenarios: list[str],
+    concurrency_levels: list[int],
+    requests: int,
+) -> list[dict[str, Any]]:
+    results = []
+    created_ids = []
+
+    with httpx.Client(base_url=base_url, timeout=None) as client:
+        response = client.post("/source-connection/", json=payload)
+        response.raise_for_status()
+        id = response.json()["id"]
+        created_ids.append(id)
+
+        def sender(method: str, path: str, params: dict) -> Callable:
+            def send() -> httpx.Response:
+                response = client.request(
+                    method,
+                    path.format(id=id),
+                    params=params,
+                    json=payload if method == "POST" else None,
+                )
+                if path == "/source-connection/" and response.is_success:
+                    created_ids.append(response.json()["id"])
+                return response
+
+            return send
+
+        try:
+            for name in scenarios:
+                method, path, params = SCENARIOS[name]
+                scenario_requests = (
+                    max(requests // 10, 1) if name in FULL_TABLE_SCENARIOS else requests
+                )
+
+                for concurrency in concurrency_levels:
+                    result = run_scenario(
+                        sender(method, path, params), scenario_requests, concurrency
+                    )
+                    results.append(
+                        {"scenario": name, "concurrency": concurrency, **result}
+                    )
+                    print(
+                        f"{name:>15} x{concurrency:<4} "
+                        f"{result['throughput']:>9.1f} req/s  "
+                        f"p50 {result['latency_ms']['p50']:>8.1f}ms  "
+                        f"p95 {result['latency_ms']['p95']:>8.1f}ms  "
+                        f"errors {result['errors']}"
+                    )
+        finally:
+            for created_id in created_ids:
+                client.delete(f"/source-connection/{created_id}")
+
+    return results
+
+
+def compare(
+    results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float
+) -> list[str]:
+    """Returns the regressions of the results against the baseline."""
+    baseline_results = {
+        (result["scenario"], result["concurrency"]): result for result in baseline
+    }
+    regressions = []
+
+    for result in results:
+        key = (result["scenario"], result["concurrency"])
+        base = baseline_results.get(key)
+
+        if not base:
+            continue
+
+        name = f"{key[0]} x{key[1]}"
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+
+        if p95 > base_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base_p95}ms -> {p95}ms")
+        if result["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {base['throughput']} -> "
+                f"{result['throughput']} req/s"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {result['errors']}")
+
+    return regressions
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--type", choices=["mysql", "postgresql"], default="mysql")
+    parser.add_argument("--table", default="bench_0")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(
+        args.base_url,
+        source_connection(args.type, args.table, args.schema),
+        args.scenarios,
+        args.concurrency,
+        args.requests,
+    )
+
+    with open(args.output, "w") as file:
+        json.dump(
+            {
+                "type": args.type,
+                "table": args.table,
+                "revision": git_revision(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file)["results"], args.tolerance)
+
+        for regression in regressions:
+            print(f"regression: {regression}")
+
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,143 @@
+"""
+Seeds benchmark tables in the local MySQL or PostgreSQL database.
+
+Creates tables named <prefix>_<index>, each with an integer primary key and
+`--width` more columns cycling through integer, text, decimal and timestamp
+types. The database server generates their rows itself, in chunks, so that
+seeding millions of rows takes minutes rather than hours.
+
+Usage: python benchmarks/seed.py --type postgresql --tables 10 --rows 100000 --width 20
+"""
+
+import argparse
+from time import perf_counter
+
+from sources import url
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    create_engine,
+    text,
+)
+
+DRIVERS = {"mysql": "mysql+pymysql", "postgresql": "postgresql+psycopg2"}
+COLUMN_TYPES = [Integer, lambda: String(64), lambda: Numeric(12, 2), DateTime]
+
+# column values generated from the row number n, per column type
+VALUES = {
+    "mysql": [
+        "(n * {index}) % 100000",
+        "MD5(n + {index})",
+        "(n % 100000) / 100",
+        "TIMESTAMPADD(SECOND, n + {index}, '2020-01-01')",
+    ],
+    "postgresql": [
+        "(n * {index}) % 100000",
+        "md5((n + {index})::text)",
+        "(n % 100000) / 100.0",
+        "timestamp '2020-01-01' + (n + {index}) * interval '1 second'",
+    ],
+}
+# rows numbered start to stop
+SERIES = {
+    "mysql": (
+        "WITH RECURSIVE seq (n) AS (SELECT :start UNION ALL "
+        "SELECT n + 1 FROM seq WHERE n < :stop) SELECT {values} FROM seq"
+    ),
+    "postgresql": "SELECT {values} FROM generate_series(:start, :stop) AS n",
+}
+
+
+def table(metadata: MetaData, name: str, width: int, schema: str | None) -> Table:
+    columns = [Column("id", Integer, primary_key=True, autoincrement=False)]
+    columns += [
+        Column(f"column_{index}", COLUMN_TYPES[index % len(COLUMN_TYPES)]())
+        for index in range(1, width + 1)
+    ]
+    return Table(name, metadata, *columns, schema=schema)
+
+
+def qualified_name(table_: Table) -> str:
+    return f"{table_.schema}.{table_.name}" if table_.schema else table_.name
+
+
+def insert_statement(type: str, table_: Table, width: int) -> str:
+    values = ["n"] + [
+        VALUES[type][index % len(COLUMN_TYPES)].format(index=index)
+        for index in range(1, width + 1)
+    ]
+    columns = ", ".join(column.name for column in table_.columns)
+    return f"INSERT INTO {qualified_name(table_)} ({columns}) " + SERIES[type].format(
+        values=", ".join(values)
+    )
+
+
+def seed(
+    type: str,
+    tables: int,
+    rows: int,
+    width: int,
+    chunk: int,
+    prefix: str,
+    schema: str,
+):
+    engine = create_engine(url(type, DRIVERS[type]))
+    schema = schema if type == "postgresql" else None
+    metadata = MetaData()
+    tables_ = [
+        table(metadata, f"{prefix}_{index}", width, schema) for index in range(tables)
+    ]
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    for table_ in tables_:
+        started = perf_counter()
+        statement = text(insert_statement(type, table_, width))
+
+        with engine.connect() as connection:
+            if type == "mysql":
+                connection.execute(
+                    text(f"SET SESSION cte_max_recursion_depth = {chunk}")
+                )
+
+            # one transaction per chunk keeps undo logs small
+            for start in range(1, rows + 1, chunk):
+                stop = min(start + chunk - 1, rows)
+                connection.execute(statement, {"start": start, "stop": stop})
+                connection.commit()
+
+            analyze = "ANALYZE TABLE" if type == "mysql" else "ANALYZE"
+            connection.execute(text(f"{analyze} {qualified_name(table_)}"))
+            connection.commit()
+
+        print(f"{table_.name}: {rows} rows in {perf_counter() - started:.1f}s")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--type", choices=DRIVERS.keys(), default="mysql")
+    parser.add_argument("--tables", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--chunk", type=int, default=100000)
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--schema", default="public")
+    args = parser.parse_args()
+
+    seed(
+        args.type,
+        args.tables,
+        args.rows,
+        args.width,
+        args.chunk,
+        args.prefix,
+        args.schema,
+    )
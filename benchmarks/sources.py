@@ -0,0 +1,30 @@
+"""Local source databases of the benchmarks, configured like the tests."""
+
+from os import getenv
+
+ENV_PREFIXES = {"mysql": "MYSQL", "postgresql": "POSTGRES"}
+
+
+def url(type: str, driver: str) -> str:
+    prefix = ENV_PREFIXES[type]
+    user = getenv(f"{prefix}_USER")
+    password = getenv(f"{prefix}_PASSWORD")
+    host = getenv(f"{prefix}_HOST")
+    port = getenv(f"{prefix}_PORT")
+    db = getenv("MYSQL_DATABASE" if type == "mysql" else "POSTGRES_DB")
+    return f"{driver}://{user}:{password}@{host}:{port}/{db}"
+
+
+def source_connection(type: str, table: str, schema: str = "public") -> dict:
+    """Returns the API payload of a source connection to a local table."""
+    prefix = ENV_PREFIXES[type]
+    return {
+        "type": type,
+        "schema_name": schema if type == "postgresql" else None,
+        "table_name": table,
+        "user": getenv(f"{prefix}_USER"),
+        "password": getenv(f"{prefix}_PASSWORD"),
+        "host": getenv(f"{prefix}_HOST"),
+        "port": getenv(f"{prefix}_PORT"),
+        "db": getenv("MYSQL_DATABASE" if type == "mysql" else "POSTGRES_DB"),
+    }
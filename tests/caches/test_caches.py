@@ -0,0 +1,13 @@
+from app.caches import TTLCache
+
+
+def test_cache_entry_ttl():
+    cache = TTLCache("test", max_size=2, ttl=60)
+
+    cache.set("kept", 1)
+    cache.set("expired", 2, ttl=0)
+    assert cache.get("kept")[0] == 1
+    assert cache.get("expired") is None
+
+    cache.set("kept", 3, ttl=0)
+    assert cache.get("kept") is None
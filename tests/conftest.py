@@ -1,11 +1,21 @@
+from pathlib import Path
+from tempfile import mkdtemp
+
 import pytest
 from dotenv import load_dotenv
-from sqlmodel import Session, SQLModel, StaticPool, create_engine
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 load_dotenv()
-sqlite_url = "sqlite:///:memory:"
+# a file shared by the sync and async engines
+sqlite_file_name = Path(mkdtemp()) / "test.db"
 connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, connect_args=connect_args, poolclass=StaticPool)
+engine = create_engine(f"sqlite:///{sqlite_file_name}", connect_args=connect_args)
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{sqlite_file_name}", poolclass=NullPool
+)
 
 
 def get_session_replacement():
@@ -13,6 +23,11 @@ def get_session_replacement():
         yield session
 
 
+async def get_async_session_replacement():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_and_teardown():
     SQLModel.metadata.create_all(engine)
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert
+
+from app.databases.mysql import MySQLdb
+from app.databases.queries import MAX_CHUNKS, key_range_chunks
+
+engine = create_engine("sqlite://")
+metadata = MetaData()
+# sparse keys, 1 to 400 squared
+items = Table("items", metadata, Column("id", Integer, primary_key=True))
+empty_items = Table("empty_items", metadata, Column("id", Integer, primary_key=True))
+metadata.create_all(engine)
+keys = [key * key for key in range(1, 401)]
+
+with engine.begin() as connection:
+    connection.execute(insert(items), [{"id": key} for key in keys])
+
+
+@pytest.mark.parametrize("ranked", [True, False])
+def test_key_range_chunks(ranked):
+    with engine.connect() as connection:
+        chunks = key_range_chunks(connection, items, ["id"], 100, ranked)
+        rows = [connection.execute(chunk).all() for chunk in chunks]
+
+        assert [row.id for chunk_rows in rows for row in chunk_rows] == keys
+        if ranked:
+            assert [len(chunk_rows) for chunk_rows in rows] == [100] * 4
+        else:
+            assert len(chunks) == MAX_CHUNKS
+
+        assert len(key_range_chunks(connection, empty_items, ["id"], 100, ranked)) == 1
+
+
+def test_key_range_chunks_without_window_functions():
+    # SQLite reports a server version below MySQL 8, as MySQL 5.7 would
+    database = MySQLdb({"table_name": "items"}, engine)
+    chunks = database.get_table_chunks(100000)
+
+    assert len(chunks) == 2
+    assert [
+        row.id for chunk in chunks for row in database.get_chunk_rows(chunk)
+    ] == keys
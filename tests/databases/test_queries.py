@@ -0,0 +1,17 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, MetaData, Numeric, Table
+
+from app.databases.queries import Error, keyset_select
+
+prices = Table("prices", MetaData(), Column("id", Numeric(10, 2), primary_key=True))
+
+
+def test_keyset_select_invalid_cursor():
+    assert keyset_select(prices, ["id"], after=["1.50"]) is not None
+
+    with pytest.raises(HTTPException) as error:
+        keyset_select(prices, ["id"], after=["abc"])
+
+    assert error.value.status_code == 422
+    assert error.value.detail == Error.INVALID_CURSOR_ERROR
@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert
+
+from app.databases.mysql import MySQLdb
+from app.databases.postgres import PostgreSQLdb
+
+# source tables are read through the database classes bound to SQLite,
+# so that their statements are built and run without a source server
+engine = create_engine("sqlite://")
+metadata = MetaData()
+items = Table(
+    "items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("updated_at", Integer, nullable=False),
+    Column("name", String),
+)
+metadata.create_all(engine)
+
+with engine.begin() as connection:
+    connection.execute(
+        insert(items),
+        [
+            {"id": 1, "updated_at": 1, "name": "a"},
+            {"id": 2, "updated_at": 2, "name": "b"},
+            {"id": 3, "updated_at": 2, "name": "a"},
+            {"id": 4, "updated_at": 3, "name": "a"},
+        ],
+    )
+
+source_connection = {"table_name": "items", "schema_name": None}
+
+
+@pytest.mark.parametrize("database_class", [MySQLdb, PostgreSQLdb])
+def test_watermarked_and_filtered_rows(database_class):
+    database = database_class(source_connection, engine)
+
+    rows = database.get_table_rows(
+        limit=1, watermark="updated_at", since="1", filters=["name:eq:a"]
+    )
+    assert [row["id"] for row in rows] == [3]
+
+    rows = database.get_table_rows(
+        limit=10,
+        watermark="updated_at",
+        since="2",
+        filters=["name:eq:a"],
+        after=["3"],
+    )
+    assert [row["id"] for row in rows] == [4]
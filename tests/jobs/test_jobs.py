@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.dependencies import get_session
+from app.jobs import JOB_HANDLERS, JobWorker
+from app.main import app
+from app.models.job import Job, JobStatus
+from app.routers.jobs import Error
+from tests.conftest import engine, get_session_replacement
+from tests.factories.source_connection_factory import SourceConnectionFactory
+
+client = TestClient(app)
+
+app.dependency_overrides[get_session] = get_session_replacement
+
+factory = SourceConnectionFactory()
+mysql_conn = factory.get_source_connection("mysql")
+url = "/jobs/{0}"
+
+
+def test_cancel_queued_job():
+    response = client.post(url.format(""), json={"kind": "test-batch"})
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert response_json["status"] == "queued"
+
+    response_id = response_json.get("id")
+
+    response = client.post(url.format(response_id) + "/cancel")
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "cancelled"
+
+    response = client.post(url.format(response_id) + "/cancel")
+    assert response.status_code == 409, response.text
+    assert response.json()["detail"] == Error.NOT_CANCELLABLE_ERROR
+
+    response = client.get(url.format(response_id) + "/result")
+    assert response.status_code == 409, response.text
+
+
+def test_run_batch_test_job(tmp_path):
+    response = client.post(
+        url.format(""), json={"kind": "test-batch", "parameters": {"ids": []}}
+    )
+    assert response.status_code == 200, response.text
+    response_id = response.json().get("id")
+
+    assert JobWorker(engine, results_dir=tmp_path).run_once()
+
+    response = client.get(url.format(response_id))
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "succeeded"
+
+    response = client.get(url.format(response_id) + "/result")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text == ""
+
+    assert not JobWorker(engine, results_dir=tmp_path).run_once()
+
+
+def test_claim_of_job_with_expired_lease(tmp_path):
+    response = client.post(
+        url.format(""), json={"kind": "test-batch", "parameters": {"ids": []}}
+    )
+    assert response.status_code == 200, response.text
+    response_id = response.json().get("id")
+
+    with Session(engine) as session:
+        job = session.get(Job, response_id)
+        job.status = JobStatus.RUNNING
+        job.started_at = job.heartbeat_at = datetime.now(timezone.utc)
+        session.add(job)
+        session.commit()
+
+    assert not JobWorker(engine, results_dir=tmp_path, lease_timeout=60).run_once()
+
+    with Session(engine) as session:
+        job = session.get(Job, response_id)
+        job.heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=120)
+        session.add(job)
+        session.commit()
+
+    assert JobWorker(engine, results_dir=tmp_path, lease_timeout=60).run_once()
+
+    response = client.get(url.format(response_id))
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "succeeded"
+
+
+def test_cancel_running_job():
+    response = client.post(url.format(""), json={"kind": "test-batch"})
+    assert response.status_code == 200, response.text
+    response_id = response.json().get("id")
+
+    with Session(engine) as session:
+        job = session.get(Job, response_id)
+        job.status = JobStatus.RUNNING
+        session.add(job)
+        session.commit()
+
+    response = client.post(url.format(response_id) + "/cancel")
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "running"
+    assert response.json()["cancel_requested"]
+
+    with Session(engine) as session:
+        job = session.get(Job, response_id)
+        job.status = JobStatus.SUCCEEDED
+        session.add(job)
+        session.commit()
+
+    response = client.post(url.format(response_id) + "/cancel")
+    assert response.status_code == 409, response.text
+
+
+def test_finish_of_job_with_lost_lease(tmp_path, monkeypatch):
+    response = client.post(
+        url.format(""), json={"kind": "test-batch", "parameters": {"ids": []}}
+    )
+    assert response.status_code == 200, response.text
+    response_id = response.json().get("id")
+
+    def run_reclaimed(job, context, file):
+        # another worker claimed the job meanwhile
+        with Session(engine) as session:
+            job = session.get(Job, job.id)
+            job.lease_id = "other"
+            session.add(job)
+            session.commit()
+
+    monkeypatch.setitem(JOB_HANDLERS, "test-batch", run_reclaimed)
+    assert JobWorker(engine, results_dir=tmp_path).run_once()
+
+    response = client.get(url.format(response_id))
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "running"
+
+
+def test_run_extraction_job(tmp_path):
+    response = client.post("/source-connection/", json=mysql_conn)
+    assert response.status_code == 200, response.text
+    source_connection_id = response.json().get("id")
+
+    response = client.post(
+        url.format(""),
+        json={
+            "kind": "extract",
+            "source_connection_id": source_connection_id,
+            "parameters": {"format": "ndjson", "limit": 5},
+        },
+    )
+    assert response.status_code == 200, response.text
+    response_id = response.json().get("id")
+
+    assert JobWorker(engine, results_dir=tmp_path).run_once()
+
+    response = client.get(url.format(response_id))
+    assert response.json()["status"] == "succeeded", response.text
+    assert response.json()["progress"] <= 5
+
+    response = client.get(url.format(response_id) + "/result")
+    assert response.status_code == 200, response.text
+    assert len(response.text.splitlines()) <= 5
+
+
+def test_create_job_invalid():
+    response = client.post(
+        url.format(""), json={"kind": "catalog", "source_connection_id": 0}
+    )
+    assert response.status_code == 422, response.text
+    assert response.json()["detail"] == Error.SOURCE_CONNECTION_NOT_FOUND_ERROR
+
+    response = client.post(url.format(""), json={"kind": "unknown"})
+    assert response.status_code == 422, response.text
+
+
+def test_read_job_not_found():
+    response = client.get(url.format(0))
+    assert response.status_code == 404, response.text
+    assert response.json()["detail"] == Error.NOT_FOUND_ERROR
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.dependencies import get_session
+from app.main import app
+from app.serializers import RowsJSONResponse
+from tests.conftest import get_session_replacement
+
+client = TestClient(app)
+
+app.dependency_overrides[get_session] = get_session_replacement
+
+
+def test_metrics():
+    response = client.get("/jobs/0")
+    assert response.status_code == 404, response.text
+
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/jobs/{id}",'
+        'status="404"}' in response.text
+    )
+    assert "source_stage_duration_seconds" in response.text
+    assert "cache_requests_total" in response.text
+    assert "source_pool_checked_out" in response.text
+
+
+def test_serialization_metrics():
+    def count(format):
+        return (
+            REGISTRY.get_sample_value(
+                "serialization_duration_seconds_count", {"format": format}
+            )
+            or 0
+        )
+
+    objects, compact = count("objects"), count("compact")
+
+    response = RowsJSONResponse([{"id": 1, "price": Decimal("1.50")}], "objects")
+    assert response.body == b'[{"id":1,"price":"1.50"}]'
+    RowsJSONResponse({"columns": [], "rows": []}, "arrays")
+
+    assert count("objects") == objects + 1
+    assert count("compact") == compact + 1
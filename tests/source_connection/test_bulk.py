@@ -0,0 +1,90 @@
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_session
+from app.main import app
+from app.routers.source_connections import DUPLICATE_ID_ERROR, NOT_FOUND_ERROR
+from app.testers import Error as TestingError
+from app.validators import Error as ValidationError
+from tests.conftest import get_session_replacement
+from tests.factories.source_connection_factory import SourceConnectionFactory
+
+client = TestClient(app)
+
+app.dependency_overrides[get_session] = get_session_replacement
+
+factory = SourceConnectionFactory()
+mysql_conn = factory.get_source_connection("mysql")
+postgresql_conn = factory.get_source_connection("postgresql")
+url = "/source-connection/"
+
+
+def test_bulk_create():
+    response = client.post(
+        url + "bulk",
+        json=[
+            mysql_conn,
+            postgresql_conn,
+            {**postgresql_conn, "schema_name": None},
+            {**mysql_conn, "password": "invalid"},
+        ],
+    )
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert [result["success"] for result in response_json] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert response_json[2]["detail"] == ValidationError.SCHEMA_REQUIRED_ERROR
+    assert response_json[3]["detail"] == TestingError.INVALID_CREDENTIALS_ERROR
+
+    for result in response_json[:2]:
+        response = client.post(f"{url}{result['id']}/test")
+        assert response.status_code == 200, response.text
+        assert response.json().get("success")
+
+
+def test_bulk_update():
+    response = client.post(url, json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.post(url, json=mysql_conn)
+    assert response.status_code == 200, response.text
+    other_id = response.json().get("id")
+
+    response = client.patch(
+        url + "bulk",
+        json=[
+            {"id": response_id, "connect_timeout": 5},
+            {"id": other_id, "password": "invalid"},
+            {"id": 100000},
+        ],
+    )
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert response_json[0] == {"id": response_id, "success": True}
+    assert response_json[1]["detail"] == TestingError.INVALID_CREDENTIALS_ERROR
+    assert response_json[2]["detail"] == NOT_FOUND_ERROR
+
+    response = client.post(f"{url}{other_id}/test")
+    assert response.status_code == 200, response.text
+    assert response.json().get("success")
+
+    response = client.patch(
+        url + "bulk", json=[{"id": response_id}, {"id": response_id}]
+    )
+    assert response.status_code == 200, response.text
+    assert all(result["detail"] == DUPLICATE_ID_ERROR for result in response.json())
+
+
+def test_bulk_limits():
+    response = client.post(url + "bulk", json=[])
+    assert response.status_code == 422, response.text
+
+    response = client.post(url + "bulk?workers=0", json=[mysql_conn])
+    assert response.status_code == 422, response.text
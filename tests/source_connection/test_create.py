@@ -81,3 +81,18 @@ def test_postgresql_required_fields():
 def test_not_supported_type():
     response = client.post(url, json={**mysql_conn, "type": "sqlite"})
     assert response.status_code == 422, response.text
+
+
+def test_negative_timeouts():
+    for timeout in ["connect_timeout", "statement_timeout"]:
+        response = client.post(url, json={**mysql_conn, timeout: -5})
+        assert response.status_code == 422, response.text
+        assert ["body", timeout] in [
+            error["loc"] for error in response.json()["detail"]
+        ]
+
+        response = client.patch(f"{url}0", json={timeout: -5})
+        assert response.status_code == 422, response.text
+        assert ["body", timeout] in [
+            error["loc"] for error in response.json()["detail"]
+        ]
@@ -1,13 +1,22 @@
+import io
+import json
+from datetime import timedelta
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 from fastapi.testclient import TestClient
+from sqlalchemy.dialects import mysql
 
-from app.dependencies import get_session
+from app.dependencies import get_async_session, get_session
+from app.exporters import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE, ArrowExporter
 from app.main import app
-from tests.conftest import get_session_replacement
+from tests.conftest import get_async_session_replacement, get_session_replacement
 from tests.factories.source_connection_factory import SourceConnectionFactory
 
 client = TestClient(app)
 
 app.dependency_overrides[get_session] = get_session_replacement
+app.dependency_overrides[get_async_session] = get_async_session_replacement
 
 factory = SourceConnectionFactory()
 mysql_conn = factory.get_source_connection("mysql")
@@ -55,6 +64,29 @@ def test_retrieval_of_table_rows():
     assert isinstance(response_json, list)
 
 
+def test_retrieval_of_table_rows_compact_formats():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/rows?limit=2&format=arrays")
+    assert response.status_code == 200, response.text
+    response_json = response.json()
+    assert {"name", "type"} == set(response_json["columns"][0])
+    assert all(
+        len(row) == len(response_json["columns"]) for row in response_json["rows"]
+    )
+
+    response = client.get(url.format(response_id) + "/rows?limit=2&format=columnar")
+    assert response.status_code == 200, response.text
+    response_json = response.json()
+    assert len(response_json["values"]) == len(response_json["columns"])
+    assert all(len(values) <= 2 for values in response_json["values"])
+
+
 def test_retrieval_of_table_rows_invalid_limit():
     response = client.post(url.format(""), json=mysql_conn)
     response_json = response.json()
@@ -63,3 +95,379 @@ def test_retrieval_of_table_rows_invalid_limit():
 
     response = client.get(url.format(response_json.get("id")) + "/rows?limit=200")
     assert response.status_code == 422, response.text
+
+
+def test_retrieval_of_filtered_table_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/table-schema")
+    assert response.status_code == 200, response.text
+    column_name = response.json()[0]["name"]
+
+    response = client.get(
+        url.format(response_id) + "/rows",
+        params={
+            "columns": [column_name],
+            "filter": [f"{column_name}:notnull"],
+            "order": [f"-{column_name}"],
+        },
+    )
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert all(list(row) == [column_name] for row in response_json)
+    values = [row[column_name] for row in response_json]
+    assert values == sorted(values, reverse=True)
+
+    response = client.get(
+        url.format(response_id) + "/rows/stream",
+        params={"columns": [column_name], "filter": [f"{column_name}:notnull"]},
+    )
+    assert response.status_code == 200, response.text
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert all(list(row) == [column_name] for row in rows)
+
+    for filter_ in [f"{column_name}:between:1", "unknown:eq:1"]:
+        response = client.get(
+            url.format(response_id) + "/rows", params={"filter": [filter_]}
+        )
+        assert response.status_code == 422, response.text
+
+    response = client.get(
+        url.format(response_id) + "/rows", params={"columns": ["unknown"]}
+    )
+    assert response.status_code == 422, response.text
+
+    column_names = [
+        column["name"]
+        for column in client.get(url.format(response_id) + "/table-schema").json()
+        if column["primary_key"] == "False"
+    ]
+
+    if column_names:
+        response = client.get(
+            url.format(response_id) + "/rows",
+            params={"watermark": column_names[0], "columns": column_names[1:]},
+        )
+        assert response.status_code == 422, response.text
+
+        response = client.get(
+            url.format(response_id) + "/rows/stream",
+            params={"columns": column_names},
+        )
+        assert response.status_code == 422, response.text
+
+
+def test_retrieval_of_many_tables_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+    table_name = mysql_conn["table_name"]
+
+    response = client.get(url.format(response_id) + "/table-schema")
+    assert response.status_code == 200, response.text
+    column_name = response.json()[0]["name"]
+
+    response = client.get(
+        url.format(response_id) + "/rows/tables",
+        params={"table": [table_name], "column": [f"{table_name}.{column_name}"]},
+    )
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert list(response_json) == [table_name]
+    assert all(list(row) == [column_name] for row in response_json[table_name])
+
+    response = client.get(
+        url.format(response_id) + "/rows/tables",
+        params={"table": [table_name], "column": ["unknown.column"]},
+    )
+    assert response.status_code == 422, response.text
+
+    response = client.get(
+        url.format(response_id) + "/rows/tables",
+        params={"table": [table_name, "unknown_table"]},
+    )
+    assert response.status_code == 422, response.text
+
+
+def test_table_schema_cache_and_refresh():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/table-schema")
+    assert response.status_code == 200, response.text
+    assert response.headers.get("x-cache") == "MISS"
+
+    response = client.get(url.format(response_id) + "/table-schema")
+    assert response.status_code == 200, response.text
+    assert response.headers.get("x-cache") == "HIT"
+    assert "age" in response.headers
+
+    response = client.post(url.format(response_id) + "/refresh-metadata")
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert response_json.get("success")
+
+    response = client.get(url.format(response_id) + "/table-schema")
+    assert response.status_code == 200, response.text
+    assert response.headers.get("x-cache") == "MISS"
+
+
+def test_sampling_of_table_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/sample?size=5&seed=42")
+    assert response.status_code == 200, response.text
+    response_json = response.json()
+    assert response_json["seed"] == 42
+    assert len(response_json["rows"]) <= 5
+
+    response = client.get(url.format(response_id) + "/sample?size=5&seed=42")
+    assert response.json()["rows"] == response_json["rows"]
+
+    response = client.get(url.format(response_id) + "/sample?size=0")
+    assert response.status_code == 422, response.text
+
+
+def test_profiling_of_table_columns():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/profile")
+    assert response.status_code == 200, response.text
+    assert response.headers["X-Cache"] == "MISS"
+    profile = response.json()
+    assert profile["sampled"] is False
+    assert {"name", "null_count", "distinct_count", "min", "max"} <= set(
+        profile["columns"][0]
+    )
+
+    response = client.get(url.format(response_id) + "/profile")
+    assert response.headers["X-Cache"] == "HIT"
+
+    response = client.get(url.format(response_id) + "/profile?sample_size=10")
+    assert response.status_code == 200, response.text
+    assert response.json()["sampled"] is True
+
+
+def test_streaming_of_table_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/rows/stream?limit=2")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) <= 2
+
+    if rows:
+        response = client.get(
+            url.format(response_id) + f"/rows/stream?after={rows[-1]['id']}&limit=2"
+        )
+        assert response.status_code == 200, response.text
+
+        next_rows = [json.loads(line) for line in response.text.splitlines()]
+        assert all(row["id"] > rows[-1]["id"] for row in next_rows)
+
+
+def test_incremental_extraction_of_table_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/rows?watermark=id&limit=2")
+    assert response.status_code == 200, response.text
+    rows = response.json()
+
+    if rows:
+        assert response.headers["X-Next-Watermark"] == str(rows[-1]["id"])
+
+        response = client.get(
+            url.format(response_id) + "/rows",
+            params={
+                "watermark": "id",
+                "limit": 2,
+                "since": response.headers["X-Next-Watermark"],
+                "after": [rows[-1]["id"]],
+            },
+        )
+        assert response.status_code == 200, response.text
+        assert all(row["id"] > rows[-1]["id"] for row in response.json())
+
+    response = client.get(url.format(response_id) + "/rows?watermark=id&after=1")
+    assert response.status_code == 422, response.text
+
+    response = client.get(
+        url.format(response_id) + "/rows/changes?watermark=id&save=true"
+    )
+    assert response.status_code == 200, response.text
+    changed_rows = [json.loads(line) for line in response.text.splitlines()]
+
+    if changed_rows:
+        assert response.headers["X-Watermark"] == str(changed_rows[-1]["id"])
+
+    response = client.get(url.format(response_id) + "/rows/changes?watermark=id")
+    assert response.status_code == 200, response.text
+    assert response.text == ""
+
+    response = client.get(url.format(response_id) + "/watermarks")
+    assert response.status_code == 200, response.text
+    assert [watermark["column"] for watermark in response.json()] == (
+        ["id"] if changed_rows else []
+    )
+
+    response = client.get(url.format(response_id) + "/rows?watermark=unknown")
+    assert response.status_code == 422, response.text
+
+
+def test_parallel_extraction_of_table_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/rows/stream")
+    assert response.status_code == 200, response.text
+    rows = [json.loads(line) for line in response.text.splitlines()]
+
+    response = client.get(
+        url.format(response_id) + "/rows/parallel?parallelism=2&chunk_size=1"
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == rows
+
+    response = client.get(
+        url.format(response_id) + "/rows/parallel?chunk_size=1&ordered=false"
+    )
+    assert response.status_code == 200, response.text
+    assert len(response.text.splitlines()) == len(rows)
+
+
+def test_export_of_table_rows():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/rows/export?limit=5")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == ARROW_MEDIA_TYPE
+    assert pa.ipc.open_stream(response.content).read_all().num_rows <= 5
+
+    response = client.get(url.format(response_id) + "/rows/export?format=parquet")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == PARQUET_MEDIA_TYPE
+    assert pq.read_table(io.BytesIO(response.content)).num_rows >= 0
+
+
+def test_export_of_mysql_time_values():
+    columns = [{"name": "elapsed", "type": mysql.TIME(), "nullable": True}]
+    rows = [(timedelta(hours=-838, seconds=1),), (timedelta(hours=25),), (None,)]
+
+    content = b"".join(ArrowExporter(columns).to_arrow_stream(iter([rows])))
+    table = pa.ipc.open_stream(content).read_all()
+    assert table.schema.field("elapsed").type == pa.duration("us")
+    assert table.column("elapsed").to_pylist() == [row[0] for row in rows]
+
+
+def test_schema_diff():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/schema-diff")
+    assert response.status_code == 200, response.text
+    response_json = response.json()
+    assert response_json["fingerprint"]
+    assert response_json["added"]
+
+    fingerprint = response_json["fingerprint"]
+
+    response = client.get(url.format(response_id) + "/schema-diff")
+    assert response.status_code == 200, response.text
+    response_json = response.json()
+    assert response_json["fingerprint"] == fingerprint
+    assert response_json["previous_fingerprint"] == fingerprint
+    assert response_json["added"] == []
+    assert response_json["removed"] == []
+    assert response_json["changed"] == []
+
+
+def test_retrieval_of_catalog():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response = client.get(url.format(response_json.get("id")) + "/catalog")
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert isinstance(response_json, list)
+
+    tables = {table["name"]: table for table in response_json}
+    assert mysql_conn["table_name"] in tables
+
+    table = tables[mysql_conn["table_name"]]
+    assert table["columns"]
+    assert "primary_key" in table
+    assert "foreign_keys" in table
+    assert "indexes" in table
+    assert "row_estimate" in table
+
+
+def test_retrieval_of_table_stats():
+    response = client.post(url.format(""), json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+
+    response = client.get(url.format(response_id) + "/table-stats")
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "row_estimate" in response_json
+    assert "total_bytes" in response_json
+    assert "last_analyzed" in response_json
+    assert "exact_row_count" not in response_json
+
+    response = client.get(url.format(response_id) + "/table-stats?exact=true")
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert response_json.get("exact_row_count") >= 0
@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.dependencies import get_session
+from app.main import app
+from app.models.source_connection import SourceConnection
+from tests.conftest import engine, get_session_replacement
+from tests.factories.source_connection_factory import SourceConnectionFactory
+
+client = TestClient(app)
+
+app.dependency_overrides[get_session] = get_session_replacement
+
+factory = SourceConnectionFactory()
+url = "/source-connection/"
+
+
+def save_source_connections(type: str, host: str, count: int) -> list[int]:
+    with Session(engine) as session:
+        source_connections = [
+            SourceConnection(**{**factory.get_source_connection(type), "host": host})
+            for _ in range(count)
+        ]
+        session.add_all(source_connections)
+        session.commit()
+
+        return [source_connection.id for source_connection in source_connections]
+
+
+def test_list_pages():
+    ids = save_source_connections("mysql", "list-pages", 5)
+
+    response = client.get(url, params={"host": "list-pages", "limit": 3})
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response_json] == ids[:3]
+    assert all("password" not in item for item in response_json)
+    assert response.headers.get("x-next-after") == str(ids[2])
+
+    response = client.get(
+        url,
+        params={"host": "list-pages", "limit": 3, "after": ids[2]},
+    )
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response_json] == ids[3:]
+    assert "x-next-after" not in response.headers
+
+
+def test_list_filters():
+    mysql_ids = save_source_connections("mysql", "list-filters", 2)
+    postgresql_ids = save_source_connections("postgresql", "list-filters", 2)
+
+    response = client.get(url, params={"host": "list-filters"})
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()] == mysql_ids + postgresql_ids
+
+    response = client.get(url, params={"host": "list-filters", "type": "postgresql"})
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()] == postgresql_ids
+
+    response = client.get(url, params={"type": "oracle"})
+    assert response.status_code == 422, response.text
+
+
+def test_list_not_modified():
+    save_source_connections("mysql", "list-etag", 2)
+
+    response = client.get(url, params={"host": "list-etag"})
+    assert response.status_code == 200, response.text
+    etag = response.headers.get("etag")
+    assert etag
+
+    response = client.get(
+        url, params={"host": "list-etag"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304, response.text
+    assert response.headers.get("etag") == etag
+
+    save_source_connections("mysql", "list-etag", 1)
+
+    response = client.get(
+        url, params={"host": "list-etag"}, headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 3
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import patch
 
 from fastapi.testclient import TestClient
@@ -41,6 +42,14 @@ def test_database_connection():
     assert all(response_json.values())
 
 
+def test_check_timings():
+    response = client.post(url1, json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "connect" in response_json.get("timings")
+    assert "total" in response_json.get("timings")
+
+
 def test_invalid_credentials():
     response = client.post(
         url1,
@@ -72,10 +81,57 @@ def mocked_version(*args):
 )
 def test_non_supported_version():
     response = client.post(
-        url1,
+        url1 + "?fresh=true",
         json=mysql_conn,
     )
     response_json = response.json()
     assert response.status_code == 200, response.text
     assert not response_json.get("supported_version_test")
     assert not all(response_json.values())
+
+
+def test_cached_connection_test():
+    response = client.post(url1, json=mysql_conn)
+    assert response.status_code == 200, response.text
+
+    response = client.post(url1, json=mysql_conn)
+    assert response.status_code == 200, response.text
+    assert response.headers.get("x-cache") == "HIT"
+
+    response = client.post(url1 + "?fresh=true", json=mysql_conn)
+    assert response.status_code == 200, response.text
+    assert response.headers.get("x-cache") == "MISS"
+
+
+def test_batch_connection_test():
+    response = client.post("/source-connection/", json=mysql_conn)
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert "id" in response_json
+
+    response_id = response_json.get("id")
+    not_existing_id = 100000
+
+    response = client.post(
+        "/source-connection/test-batch", json={"ids": [response_id, not_existing_id]}
+    )
+    assert response.status_code == 200, response.text
+
+    results = {
+        result["id"]: result for result in map(json.loads, response.text.splitlines())
+    }
+    assert results[response_id].get("success")
+    assert not results[not_existing_id].get("success")
+
+
+def test_circuit_breakers():
+    response = client.post(url1, json={**mysql_conn, "host": "invalid_host"})
+    assert response.status_code == 200, response.text
+
+    response = client.get("/source-connection/circuit-breakers")
+    response_json = response.json()
+    assert response.status_code == 200, response.text
+    assert any("invalid_host" in breaker["host"] for breaker in response_json)
+    assert all(
+        breaker["state"] in ["closed", "open", "half-open"] for breaker in response_json
+    )